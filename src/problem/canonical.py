@@ -0,0 +1,144 @@
+import numpy as np
+import sys
+from itertools import permutations, product
+
+sys.path.append("src/")
+from constants import SIZE, BLOCK_SIZE
+
+
+def get_line_permutations():
+    """
+    Returns all permutations of lines (rows or columns) that keep each
+    line in its band, as array of shape ((BLOCK_SIZE!)**BLOCK_SIZE, SIZE)
+    """
+    in_band = list(permutations(range(BLOCK_SIZE)))
+    return np.array(
+        [
+            [
+                band * BLOCK_SIZE + line
+                for band, lines in enumerate(bands)
+                for line in lines
+            ]
+            for bands in product(in_band, repeat=BLOCK_SIZE)
+        ],
+        dtype=np.intp,
+    )
+
+
+LINE_PERMS = get_line_permutations()
+
+
+def minimal_rows(rows):
+    """
+    Returns ids of rows (array of shape (N, SIZE)) equal
+    to the lexicographically smallest of them
+    """
+    ids = np.arange(len(rows))
+    for tile in range(rows.shape[1]):
+        column = rows[ids, tile]
+        ids = ids[column == column.min()]
+        if len(ids) == 1:
+            break
+    return ids
+
+
+def canonical_form(board):
+    """
+    Returns canonical form of board: the lexicographically smallest board
+    out of all boards made from it by transposing, permuting rows within
+    bands, permuting columns within stacks and relabeling numbers
+    (in order of their first appearance, missing ones last).
+    Equivalent boards have the same canonical form.
+    Also returns the transform making it (see apply_transform).
+    The form is built row by row: each candidate transform (transposition
+    and columns permutation, rows chosen so far, numbers relabeled so far)
+    is extended by each row of the band not chosen yet, and only those
+    giving the smallest row are kept, so most of the variants are never made
+    """
+    board = np.asarray(board, dtype=np.uint8).reshape(SIZE, SIZE)
+    variants = np.stack((board, board.T))
+    is_transposed = np.repeat([0, 1], len(LINE_PERMS))
+    cols_ids = np.tile(np.arange(len(LINE_PERMS)), 2)
+    rows_chosen = np.empty((len(cols_ids), 0), dtype=np.intp)
+    numbers_maps = np.zeros((len(cols_ids), SIZE + 1), dtype=np.uint8)
+    next_labels = np.ones(len(cols_ids), dtype=np.uint8)
+    canonical_board = np.empty((SIZE, SIZE), dtype=np.uint8)
+
+    for row in range(SIZE):
+        band_start = row - row % BLOCK_SIZE
+        band_rows = np.arange(band_start, band_start + BLOCK_SIZE)
+        is_free = ~(
+            rows_chosen[:, band_start:, np.newaxis] == band_rows[np.newaxis, np.newaxis]
+        ).any(axis=1)
+        parent_ids, row_ids = np.nonzero(is_free)
+        rows = band_rows[row_ids]
+
+        is_transposed = is_transposed[parent_ids]
+        cols_ids = cols_ids[parent_ids]
+        rows_chosen = np.column_stack((rows_chosen[parent_ids], rows))
+        numbers_maps = numbers_maps[parent_ids]
+        next_labels = next_labels[parent_ids]
+
+        # Numbers of each candidate row relabeled tile by tile,
+        # new ones get the next free label
+        numbers = variants[
+            is_transposed[:, np.newaxis], rows[:, np.newaxis], LINE_PERMS[cols_ids]
+        ]
+        labeled = np.empty_like(numbers)
+        candidate_ids = np.arange(len(numbers))
+        for tile in range(SIZE):
+            tile_numbers = numbers[:, tile]
+            is_new = (tile_numbers > 0) & (
+                numbers_maps[candidate_ids, tile_numbers] == 0
+            )
+            numbers_maps[candidate_ids[is_new], tile_numbers[is_new]] = next_labels[
+                is_new
+            ]
+            next_labels += is_new
+            labeled[:, tile] = numbers_maps[candidate_ids, tile_numbers]
+
+        best = minimal_rows(labeled)
+        canonical_board[row] = labeled[best[0]]
+        is_transposed, cols_ids, rows_chosen = (
+            is_transposed[best],
+            cols_ids[best],
+            rows_chosen[best],
+        )
+        numbers_maps, next_labels = numbers_maps[best], next_labels[best]
+
+    # Numbers missing on the board take the last labels, in increasing order
+    numbers_map = numbers_maps[0]
+    missing = np.flatnonzero(numbers_map[1:] == 0) + 1
+    numbers_map[missing] = np.arange(next_labels[0], next_labels[0] + len(missing))
+    transform = (
+        bool(is_transposed[0]),
+        rows_chosen[0],
+        LINE_PERMS[cols_ids[0]],
+        numbers_map,
+    )
+    return canonical_board, transform
+
+
+def apply_transform(board, transform):
+    """
+    Transforms board as canonical_form transformed the board
+    it returned transform for
+    """
+    is_transposed, rows_perm, cols_perm, numbers_map = transform
+    board = np.asarray(board).reshape(SIZE, SIZE)
+    if is_transposed:
+        board = board.T
+    return numbers_map[board[rows_perm][:, cols_perm]]
+
+
+def invert_transform(board, transform):
+    """
+    Brings transformed board back, inverse of apply_transform
+    """
+    is_transposed, rows_perm, cols_perm, numbers_map = transform
+    board = np.argsort(numbers_map)[np.asarray(board).reshape(SIZE, SIZE)]
+    original = np.empty_like(board)
+    original[rows_perm[:, np.newaxis], cols_perm] = board
+    if is_transposed:
+        original = original.T
+    return original
@@ -0,0 +1,133 @@
+import numpy as np
+import sys
+
+sys.path.append("src/")
+from problem.sudoku_manager import Sudoku, PEERS, FULL_MASK, POPCOUNT
+from constants import SIZE, BLOCK_SIZE
+
+BITS = (1 << np.arange(SIZE)).astype(np.uint16)
+# UNIT_TILES[unit] are flat ids of tiles of the unit (rows, columns, blocks)
+TILES = np.arange(SIZE**2).reshape(SIZE, SIZE)
+UNIT_TILES = np.concatenate(
+    (
+        TILES,
+        TILES.T,
+        TILES.reshape(BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+        .swapaxes(1, 2)
+        .reshape(SIZE, SIZE),
+    )
+)
+
+
+class Contradiction(Exception):
+    """
+    Raised when propagation finds that the board has no solution
+    """
+
+
+def eliminate_placed(masks, is_set):
+    """
+    Removes numbers of set tiles from candidates of their peers
+    """
+    placed = np.where(is_set, masks, 0)
+    used = np.bitwise_or.reduce(placed[PEERS], axis=1)
+    if (masks[is_set] & used[is_set]).any():
+        raise Contradiction("Number set twice in a unit")
+    masks[~is_set] &= ~used[~is_set]
+    if not masks.all():
+        raise Contradiction("Tile with no candidates")
+
+
+def set_hidden_singles(masks, is_set):
+    """
+    Sets tiles that are the only place for some number in their row,
+    column or block
+    """
+    has = (masks[:, np.newaxis] & BITS) != 0
+    in_unit = has[UNIT_TILES]
+    count = in_unit.sum(axis=1)
+    if not count.all():
+        raise Contradiction("Number with no place in a unit")
+
+    units, nums = np.nonzero(count == 1)
+    tiles = UNIT_TILES[units, np.argmax(in_unit[units, :, nums], axis=1)]
+    singles = np.zeros(SIZE**2, dtype=masks.dtype)
+    np.bitwise_or.at(singles, tiles, BITS[nums])
+    is_new = (singles != 0) & ~is_set
+    if (POPCOUNT[singles[is_new]] > 1).any():
+        raise Contradiction("Tile is the only place for two numbers")
+    masks[is_new] = singles[is_new]
+    is_set |= is_new
+
+
+def locked_in_lines(has):
+    """
+    For has of shape (SIZE, lines, tiles of line), telling where each
+    number is still possible, returns where it is removed by locked
+    candidates: a number possible in only one line of a block is removed
+    from the rest of the line (pointing), a number possible in only one
+    block of a line is removed from the rest of the block (claiming)
+    """
+    segments = has.reshape(SIZE, BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+    segments = segments.any(axis=4)
+    pointing = segments & (segments.sum(axis=2, keepdims=True) == 1)
+    removed = pointing.any(axis=3, keepdims=True) & ~pointing
+    claiming = segments & (segments.sum(axis=3, keepdims=True) == 1)
+    removed |= claiming.any(axis=2, keepdims=True) & ~claiming
+    return np.repeat(removed, BLOCK_SIZE, axis=3).reshape(SIZE, SIZE, SIZE) & has
+
+
+def eliminate_locked(masks):
+    """
+    Removes candidates ruled out by locked candidates in rows and columns.
+    Set tiles count as the only place of their number
+    """
+    has = ((masks[:, np.newaxis] & BITS) != 0).T.reshape(SIZE, SIZE, SIZE)
+    removed = locked_in_lines(has)
+    removed |= locked_in_lines(has.swapaxes(1, 2)).swapaxes(1, 2)
+    removed_bits = np.where(removed.reshape(SIZE, SIZE**2), BITS[:, np.newaxis], 0)
+    masks &= ~np.bitwise_or.reduce(removed_bits, axis=0).astype(masks.dtype)
+
+
+def presolve(board):
+    """
+    Runs constraint propagation on board (0 for empty tiles) until nothing
+    changes: naked singles, hidden singles and locked candidates. Stops
+    as soon as all tiles are set. Returns new board of shape (SIZE, SIZE),
+    raises Contradiction if the board has no solution
+    """
+    board = np.asarray(board).ravel()
+    is_set = board > 0
+    masks = np.full(SIZE**2, FULL_MASK, dtype=np.uint16)
+    masks[is_set] = BITS[board[is_set] - 1]
+
+    while not is_set.all():
+        previous_masks = masks.copy()
+        # Each step sees candidates of peers of tiles set before it
+        eliminate_placed(masks, is_set)
+        is_set |= POPCOUNT[masks] == 1
+        eliminate_placed(masks, is_set)
+        set_hidden_singles(masks, is_set)
+        eliminate_placed(masks, is_set)
+        eliminate_locked(masks)
+        if np.array_equal(masks, previous_masks):
+            break
+    eliminate_placed(masks, is_set)
+
+    numbers = np.argmax((masks[:, np.newaxis] & BITS) != 0, axis=1) + 1
+    return np.where(is_set, numbers, 0).reshape(SIZE, SIZE)
+
+
+def presolve_sudoku(sudoku: Sudoku):
+    """
+    Returns sudoku with tiles set by presolve given, so solvers search only
+    the tiles left. Given sudoku is returned if it has no solution.
+    Works on SIZE x SIZE boards only
+    """
+    if sudoku.size != SIZE:
+        raise ValueError(f"Presolve works on {SIZE}x{SIZE} boards only")
+    try:
+        board = presolve(sudoku.board)
+    except Contradiction:
+        return sudoku
+    return Sudoku.from_board(board, sudoku.level, sudoku.board_id)
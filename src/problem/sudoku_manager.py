@@ -1,135 +1,628 @@
 from dokusan import generators
 import numpy as np
 import os
+import random
 import sys
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
 from copy import copy
+from itertools import islice
+from time import perf_counter
 
 sys.path.append("src/")
-from constants import SUDOKU_LEVELS, SIZE, BLOCK_SIZE, NUMBERS
+from constants import SUDOKU_LEVELS, SIZE, BLOCK_SIZE
 
 ABS_PATH = os.path.dirname(__file__)
 
 
-def generate_boards(num_of_gen, level):
-    for i in range(num_of_gen):
+# Boards up to this size have tables indexed by candidates bitmask
+MAX_TABLE_SIZE = 16
+
+
+def swar_popcount(masks):
+    """
+    Counts bits set in each of masks (below 2**32), summing bits
+    of all pairs, then nibbles, then bytes of a mask at once
+    """
+    x = np.array(masks, dtype=np.uint32, ndmin=1)
+    x = x - ((x >> 1) & np.uint32(0x55555555))
+    x = (x & np.uint32(0x33333333)) + ((x >> 2) & np.uint32(0x33333333))
+    x = (x + (x >> 4)) & np.uint32(0x0F0F0F0F)
+    x = (x * np.uint32(0x01010101)) >> 24
+    return x.astype(np.uint8).reshape(np.shape(masks))
+
+
+def get_peers(size, block_size):
+    """
+    Builds table of flat ids of peers of each tile: tiles (other than
+    the tile itself) that share its row, column or block.
+    Returns array of shape (size**2, 3 * size - 2 * block_size - 1)
+    """
+    tiles = np.arange(size**2)
+    rows, cols = np.divmod(tiles, size)
+    blocks = (rows // block_size) * block_size + cols // block_size
+    is_peer = (
+        (rows[:, np.newaxis] == rows)
+        | (cols[:, np.newaxis] == cols)
+        | (blocks[:, np.newaxis] == blocks)
+    )
+    np.fill_diagonal(is_peer, False)
+    return np.nonzero(is_peer)[1].reshape(size**2, -1)
+
+
+class Geometry:
+    """
+    Dimensions and tables of boards of given block size: boards of
+    size x size tiles, size being block_size**2 (9x9 for block size 3,
+    16x16 for 4, 25x25 for 5). Candidates of a tile are kept as bitmask,
+    bit (number - 1) is set if number is still possible, in uint16
+    for boards up to 16x16 and in uint32 for larger ones.
+    Whole mutable state of a sudoku lives in one flat buffer of that type:
+    board, candidates bitmasks, fixed count and failed count
+    """
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self.size = block_size**2
+        self.cells = self.size**2
+        self.numbers = np.arange(1, self.size + 1)
+        self.full_mask = (1 << self.size) - 1
+        self.dtype = np.uint16 if self.size <= 16 else np.uint32
+        self.peers = get_peers(self.size, block_size)
+        self.row_of, self.col_of = np.divmod(np.arange(self.cells), self.size)
+        self.block_of = (
+            self.row_of // block_size
+        ) * block_size + self.col_of // block_size
+        # Ids of the row, column and block of each tile, in order
+        # of units used by solvers: rows, then columns, then blocks
+        self.cell_units = np.stack(
+            (self.row_of, self.size + self.col_of, 2 * self.size + self.block_of),
+            axis=1,
+        )
+        self.board_slice = slice(0, self.cells)
+        self.candidates_slice = slice(self.cells, 2 * self.cells)
+        self.fixed_id = 2 * self.cells
+        self.failed_id = self.fixed_id + 1
+        self.state_len = self.failed_id + 1
+        self.popcount_table = None
+        self.sums_popcount_table = None
+        self.mask_bits_table = None
+        self.numbers_table = None
+        if self.size <= MAX_TABLE_SIZE:
+            self.popcount_table = swar_popcount(np.arange(1 << self.size))
+            # Sums of single bits of up to size tiles are below size << size
+            self.sums_popcount_table = swar_popcount(np.arange(self.size << self.size))
+            # mask_bits_table[mask, num - 1] tells if num is set in mask
+            self.mask_bits_table = (
+                np.arange(1 << self.size)[:, np.newaxis] >> np.arange(self.size)
+            ) & 1 == 1
+        if self.size <= SIZE:
+            self.numbers_table = [
+                self.numbers[(mask >> self.numbers - 1) & 1 == 1]
+                for mask in range(1 << self.size)
+            ]
+
+    def popcount(self, masks):
+        """
+        Counts candidates in each of masks
+        """
+        if self.popcount_table is not None:
+            return self.popcount_table[masks]
+        return swar_popcount(masks)
+
+    def sums_popcount(self, sums):
+        """
+        Counts bits set in each of sums of single bits of up to size tiles
+        """
+        if self.sums_popcount_table is not None:
+            return self.sums_popcount_table[sums]
+        return swar_popcount(sums)
+
+    def mask_bits(self, masks):
+        """
+        Returns array of shape (len(masks), size) telling if number
+        (column + 1) is set in each of masks
+        """
+        if self.mask_bits_table is not None:
+            return self.mask_bits_table[masks]
+        return (
+            masks[:, np.newaxis] >> np.arange(self.size, dtype=masks.dtype)
+        ) & 1 == 1
+
+    def mask_numbers(self, mask):
+        """
+        Returns array of numbers set in mask
+        """
+        if self.numbers_table is not None:
+            return self.numbers_table[mask]
+        return self.numbers[(int(mask) >> self.numbers - 1) & 1 == 1]
+
+
+_geometries = {}
+
+
+def get_geometry(block_size):
+    """
+    Geometry of given block size, built once per block size
+    """
+    if block_size not in _geometries:
+        _geometries[block_size] = Geometry(block_size)
+    return _geometries[block_size]
+
+
+def get_block_size(board):
+    """
+    Returns block size of board of shape (size, size) or (size**2,)
+    """
+    cells = np.size(board)
+    block_size = round(cells**0.25)
+    if block_size**4 != cells or block_size < 1:
+        raise ValueError(f"Board of {cells} tiles is not a sudoku board")
+    return block_size
+
+
+# Tables of default (SIZE x SIZE) boards
+GEOMETRY = get_geometry(BLOCK_SIZE)
+PEERS = GEOMETRY.peers
+FULL_MASK = GEOMETRY.full_mask
+POPCOUNT = GEOMETRY.popcount_table
+MASK_NUMBERS = GEOMETRY.numbers_table
+BOARD_SLICE = GEOMETRY.board_slice
+CANDIDATES_SLICE = GEOMETRY.candidates_slice
+FIXED_ID = GEOMETRY.fixed_id
+FAILED_ID = GEOMETRY.failed_id
+STATE_LEN = GEOMETRY.state_len
+# Boards of a level are packed in one corpus file: header, then boards
+# as rows of SIZE**2 uint8 numbers. A new corpus gets its header (count 0)
+# before any board and count in the header is written last, so an
+# interrupted append leaves the corpus as it was
+CORPUS_MAGIC = b"SUDOKU01"
+CORPUS_HEADER = np.dtype([("magic", "S8"), ("cells", "<u4"), ("count", "<u4")])
+GENERATE_BATCH_SIZE = 1000
+_corpora = {}
+
+
+def corpus_path(level):
+    return os.path.join(ABS_PATH, f"sudoku_boards/{level}/sudoku_{level}.corpus")
+
+
+def board_path(level, board_id):
+    return os.path.join(
+        ABS_PATH, f"sudoku_boards/{level}/sudoku_{level}_{board_id}.npy"
+    )
+
+
+def read_corpus_header(f):
+    """
+    Reads header of opened corpus file, returns count of boards.
+    An empty file or one with no header written yet (its first append
+    was interrupted) holds no boards
+    """
+    data = f.read(CORPUS_HEADER.itemsize)
+    if not data.strip(b"\0"):
+        return 0
+    header = np.frombuffer(data, CORPUS_HEADER)
+    if (
+        len(header) == 0
+        or header["magic"][0] != CORPUS_MAGIC
+        or header["cells"][0] != SIZE**2
+    ):
+        raise ValueError(f"{f.name} is not a corpus of {SIZE}x{SIZE} boards")
+    return int(header["count"][0])
+
+
+def open_corpus(level):
+    """
+    Returns read-only array of shape (N, SIZE**2) of all boards in the corpus
+    of given level, or None if there is no corpus (or it is not valid,
+    then boards are read from their .npy files). The file is mapped
+    to memory, so a board is read from disk only when used
+    """
+    path = corpus_path(level)
+    try:
+        with open(path, "rb") as f:
+            count = read_corpus_header(f)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        print(f"Corpus of level {level} is not used: {e}", file=sys.stderr)
+        return None
+    if count == 0:
+        return np.empty((0, SIZE**2), dtype=np.uint8)
+    return np.memmap(
+        path,
+        dtype=np.uint8,
+        mode="r",
+        offset=CORPUS_HEADER.itemsize,
+        shape=(count, SIZE**2),
+    )
+
+
+def get_corpus(level):
+    """
+    open_corpus, opened once per level
+    """
+    if level not in _corpora:
+        _corpora[level] = open_corpus(level)
+    return _corpora[level]
+
+
+def append_to_corpus(level, boards):
+    """
+    Appends boards (array of shape (N, SIZE, SIZE) or (N, SIZE**2))
+    to the corpus of given level, creating it if needed.
+    Returns ids of appended boards
+    """
+    boards = np.asarray(boards, dtype=np.uint8).reshape(-1, SIZE**2)
+    path = corpus_path(level)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    is_new = not os.path.exists(path)
+    with open(path, "w+b" if is_new else "r+b") as f:
+        count = 0 if is_new else read_corpus_header(f)
+        if count == 0:
+            header = np.array([(CORPUS_MAGIC, SIZE**2, 0)], CORPUS_HEADER)
+            f.seek(0)
+            f.write(header.tobytes())
+            f.flush()
+        f.seek(CORPUS_HEADER.itemsize + count * SIZE**2)
+        f.write(boards.tobytes())
+        header = np.array([(CORPUS_MAGIC, SIZE**2, count + len(boards))], CORPUS_HEADER)
+        f.seek(0)
+        f.write(header.tobytes())
+    _corpora.pop(level, None)
+    return np.arange(count, count + len(boards))
+
+
+def pack_boards(level):
+    """
+    Appends boards of given level kept in separate .npy files
+    (sudoku_{level}_0.npy, sudoku_{level}_1.npy, ...) to its corpus
+    """
+    boards = []
+    while os.path.exists(board_path(level, len(boards))):
+        boards.append(np.load(board_path(level, len(boards))))
+    return append_to_corpus(level, boards)
+
+
+def load_board(level, board_id):
+    """
+    Returns board board_id of given level, from the corpus of the level
+    or, if it is not there, from its own .npy file. Prints error
+    and returns None if there is no such board
+    """
+    corpus = get_corpus(level)
+    if corpus is not None and 0 <= board_id < len(corpus):
+        return corpus[board_id]
+    try:
+        with open(board_path(level, board_id), "rb") as f:
+            return np.load(f)
+    except OSError as e:
+        print(
+            f"There is no board with level: {level} and board_id: {board_id}: {e}",
+            file=sys.stderr,
+        )
+        return None
+
+
+def batch_seed(seed, batch_id):
+    """
+    Derives seed of a batch of generated boards, so boards do not depend
+    on which worker generates the batch
+    """
+    return int(np.random.SeedSequence([seed, batch_id]).generate_state(1)[0])
+
+
+def generate_batch(level, batch_size, seed):
+    """
+    Generates batch_size boards of given level. dokusan draws numbers
+    from the global random module, so it is seeded here, in the worker
+    """
+    random.seed(seed)
+    boards = np.empty((batch_size, SIZE**2), dtype=np.uint8)
+    for i in range(batch_size):
         board = generators.random_sudoku(avg_rank=SUDOKU_LEVELS[level])
-        board_arr = np.array(list(str(board)), dtype=int).reshape(SIZE, SIZE)
-        with open(
-            os.path.join(ABS_PATH, f"sudoku_boards/{level}/sudoku_{level}_{i}.npy"),
-            "wb",
-        ) as f:
-            np.save(f, board_arr)
+        boards[i] = np.frombuffer(str(board).encode(), np.uint8) - ord("0")
+    return boards
+
+
+def generate_boards(
+    num_of_gen,
+    level,
+    workers=None,
+    seed=None,
+    batch_size=GENERATE_BATCH_SIZE,
+    verbose=True,
+):
+    """
+    Generates boards of given level until its corpus holds num_of_gen boards.
+    Batches of batch_size boards are generated on a pool of workers
+    processes (all cores by default) and appended to the corpus in order,
+    as soon as they are ready, so an interrupted run is resumed by calling
+    it again (from the start, if no batch was appended). With the same seed,
+    a resumed run gives the same boards as an uninterrupted one
+    """
+    corpus = get_corpus(level)
+    start = 0 if corpus is None else len(corpus)
+    if start >= num_of_gen:
+        return
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    workers = workers or os.cpu_count()
+    batches_ids = iter(range(start // batch_size, -(-num_of_gen // batch_size)))
+    start_time = perf_counter()
+    generated = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        def submit(batch_id):
+            seed_of_batch = batch_seed(seed, batch_id)
+            future = executor.submit(generate_batch, level, batch_size, seed_of_batch)
+            return batch_id, future
+
+        # A few batches ahead of the one to append, so memory stays flat
+        pending = deque(map(submit, islice(batches_ids, 2 * workers)))
+        while pending:
+            batch_id, future = pending.popleft()
+            boards = future.result()
+            pending.extend(map(submit, islice(batches_ids, 1)))
+
+            # First and last batch may be needed only in part
+            first_id = batch_id * batch_size
+            boards = boards[max(start - first_id, 0) : num_of_gen - first_id]
+            append_to_corpus(level, boards)
+            generated += len(boards)
+            if verbose:
+                rate = generated / (perf_counter() - start_time)
+                print(
+                    f"{level}: {start + generated}/{num_of_gen} boards, {rate:.1f} boards/s"
+                )
+
+
+def random_board(block_size, empty_share=0.5, seed=None):
+    """
+    Returns random board of shape (size, size), size being block_size**2,
+    with empty_share of its tiles empty. A solved pattern board gets
+    its numbers, bands, stacks, rows within bands and columns within stacks
+    shuffled, then tiles are emptied at random. Unlike boards of dokusan
+    (9x9 only), it works for any size, but difficulty is not controlled
+    """
+    rand_object = np.random.RandomState(seed)
+    size = block_size**2
+
+    def shuffled_lines():
+        return np.concatenate(
+            [
+                band * block_size + rand_object.permutation(block_size)
+                for band in rand_object.permutation(block_size)
+            ]
+        )
+
+    rows = shuffled_lines()[:, np.newaxis]
+    cols = shuffled_lines()
+    pattern = (block_size * (rows % block_size) + rows // block_size + cols) % size
+    board = (rand_object.permutation(size) + 1)[pattern]
+    empty_count = int(empty_share * size**2)
+    board.flat[rand_object.choice(size**2, empty_count, replace=False)] = 0
+    return board
+
+
+def iter_sudokus(boards, level=None):
+    """
+    Yields (board_id, sudoku) for each of boards, which can be Sudoku
+    objects, boards of shape (size, size) or (size**2,), or one stacked
+    array of them. board_id is the id the sudoku was loaded with,
+    or position in boards. Boards are read one at a time,
+    so boards can be a generator of any length
+    """
+    for position, board in enumerate(boards):
+        if isinstance(board, Sudoku):
+            board_id = position if board.board_id is None else board.board_id
+            yield board_id, board
+        else:
+            yield position, Sudoku.from_board(board, level, position)
 
 
 class Sudoku(object):
-    def __init__(self, level, board_id):
-        directory = os.path.join(ABS_PATH, f"sudoku_boards/" + level)
-        filename = os.path.join(directory, f"sudoku_{level}_{board_id}.npy")
-        try:
-            with open(filename, "rb") as f:
-                self.board = np.load(f)
-        except OSError as e:
-            print(
-                f"There is no board with level: {level} and board_id: {board_id}: {e}",
-                file=sys.stderr,
-            )
-            return
+    def __init__(self, level, board_id, board=None):
+        """
+        Loads board board_id of given level (see load_board), unless
+        the board is given (see from_board). Size of the sudoku
+        follows the size of the board
+        """
+        self.level = level
+        self.board_id = board_id
+        if board is None:
+            board = load_board(level, board_id)
+            if board is None:
+                return
 
+        self.block_size = get_block_size(board)
+        self.geometry = get_geometry(self.block_size)
+        self.size = self.geometry.size
+        self.bind(np.zeros(self.geometry.state_len, dtype=self.geometry.dtype))
+        self.board[:] = np.reshape(board, (self.size, self.size))
         self.free_tiles, self.nums_left = self.get_free_in_rows()
-        self.fixed_count = len(self.__get_occupied_tiles())
+        self.fixed_count = int(np.count_nonzero(self.board))
         self.failed_count = 0
-        self.state = self.get_full_state()
+        self.is_tracked = (self.board == 0).ravel()
+        self.candidates[:] = self.get_full_candidates()
         self.__init_state_update()
+        self.initial_state = self.snapshot()
 
-    def __get_free_tiles(self):
-        free_tiles_arrs = np.where(self.board == 0)
-        return list(zip(free_tiles_arrs[0], free_tiles_arrs[1]))
-
-    def __get_occupied_tiles(self):
-        occ_tiles_arrs = np.where(self.board != 0)
-        return list(zip(occ_tiles_arrs[0], occ_tiles_arrs[1]))
-
-    def __check_row(self, possible_nums, tile):
-        for num in self.board[tile[0], :]:
-            if num != 0 and num in possible_nums:
-                possible_nums.remove(num)
-        return possible_nums
-
-    def __check_column(self, possible_nums, tile):
-        for num in self.board[:, tile[1]]:
-            if num != 0 and num in possible_nums:
-                possible_nums.remove(num)
-        return possible_nums
-
-    def __block_left_up_corner(self, tile):
-        return tuple(
-            BLOCK_SIZE * np.array([tile[0] // BLOCK_SIZE, tile[1] // BLOCK_SIZE])
+    @classmethod
+    def from_board(cls, board, level=None, board_id=None):
+        """
+        Builds sudoku from board of shape (size, size) or (size**2,),
+        with 0 for empty tiles, size being 9, 16, 25...
+        """
+        return cls(level, board_id, board)
+
+    def bind(self, state_buffer):
+        """
+        Makes given buffer of shape (geometry.state_len,) the state of this
+        sudoku. Board and candidates are views of the buffer
+        """
+        self.state_buffer = state_buffer
+        self.board = state_buffer[self.geometry.board_slice].reshape(
+            self.size, self.size
         )
+        self.candidates = state_buffer[self.geometry.candidates_slice]
+        self.state = CandidateState(self)
+
+    @property
+    def fixed_count(self):
+        return int(self.state_buffer[self.geometry.fixed_id])
+
+    @fixed_count.setter
+    def fixed_count(self, value):
+        self.state_buffer[self.geometry.fixed_id] = value
+
+    @property
+    def failed_count(self):
+        return int(self.state_buffer[self.geometry.failed_id])
+
+    @failed_count.setter
+    def failed_count(self, value):
+        self.state_buffer[self.geometry.failed_id] = value
+
+    def snapshot(self, out=None):
+        """
+        Copies state of the sudoku into out (or a new buffer)
+        """
+        if out is None:
+            return self.state_buffer.copy()
+        np.copyto(out, self.state_buffer)
+        return out
+
+    def restore(self, state_buffer):
+        np.copyto(self.state_buffer, state_buffer)
 
-    def __check_block(self, possible_nums, tile):
-        left_up_corner = self.__block_left_up_corner(tile)
-        for num in self.board[
-            left_up_corner[0] : left_up_corner[0] + BLOCK_SIZE,
-            left_up_corner[1] : left_up_corner[1] + BLOCK_SIZE,
-        ].flatten():
-            if num != 0 and num in possible_nums:
-                possible_nums.remove(num)
-        return possible_nums
-
-    def get_full_state(self):
-        state = {}
-        for tile in self.__get_free_tiles():
-            numbers = copy(NUMBERS)
-            numbers = self.__check_row(numbers, tile)
-            numbers = self.__check_column(numbers, tile)
-            numbers = self.__check_block(numbers, tile)
-            state[tile] = numbers
+    def reset(self):
+        """
+        Brings the sudoku back to the state it had after loading
+        """
+        self.restore(self.initial_state)
+
+    def view(self, state_buffer):
+        """
+        Returns sudoku sharing the puzzle with this one, but with its state
+        kept in given buffer (e.g. a row of preallocated array). Nothing
+        is copied, the buffer should be filled with snapshot or restore
+        """
+        sudoku = copy(self)
+        sudoku.bind(state_buffer)
+        return sudoku
+
+    def __getstate__(self):
+        # Views are rebuilt from the buffer, so they stay views after copy/pickle,
+        # tables of the geometry are not pickled with every sudoku
+        state = self.__dict__.copy()
+        for view in ("board", "candidates", "state", "geometry"):
+            state.pop(view, None)
         return state
 
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.geometry = get_geometry(self.block_size)
+        self.bind(self.state_buffer)
+
+    def __deepcopy__(self, memo):
+        return self.view(self.snapshot())
+
+    def get_full_candidates(self):
+        """
+        Builds bitmask of candidates for each free tile, based on
+        numbers already present in its row, column and block.
+        Tiles occupied at start have no candidates
+        """
+        geometry = self.geometry
+        board = self.board.ravel()
+        present = np.zeros(geometry.cells, dtype=geometry.dtype)
+        present[board > 0] = np.left_shift(
+            1, board[board > 0] - 1, dtype=geometry.dtype
+        )
+        used = np.bitwise_or.reduce(present[geometry.peers], axis=1)
+        candidates = (geometry.full_mask & ~used).astype(geometry.dtype)
+        candidates[~self.is_tracked] = 0
+        return candidates
+
     def __init_state_update(self):
-        for tile, numbers in self.state.items():
-            if len(numbers) == 1:
-                self.board[tile] = list(numbers)[0]
-                self.fixed_count += 1
-            elif len(numbers) == 0:
-                self.failed_count += 1
+        count = self.geometry.popcount(self.candidates)
+        is_single = self.is_tracked & (count == 1)
+        # Number of a single candidate is the length of its mask in bits
+        self.board.flat[np.flatnonzero(is_single)] = [
+            int(mask).bit_length() for mask in self.candidates[is_single]
+        ]
+        self.fixed_count += int(np.count_nonzero(is_single))
+        self.failed_count += int(np.count_nonzero(self.is_tracked & (count == 0)))
+
+    def get_candidates_table(self):
+        """
+        Returns flat ids of tiles free at start, padded table of numbers
+        still possible for each of them, of shape (free tiles, max count
+        of candidates), numbers in increasing order followed by zeros,
+        and count of candidates of each tile
+        """
+        tiles = np.flatnonzero(self.is_tracked)
+        numbers = self.geometry.numbers
+        has = (self.candidates[tiles, np.newaxis] >> (numbers - 1)) & 1 == 1
+        counts = np.count_nonzero(has, axis=1)
+        # Candidates of each tile moved to the front of its row
+        order = np.argsort(~has, axis=1, kind="stable")
+        table = np.where(np.take_along_axis(has, order, axis=1), order + 1, 0)
+        return tiles, table[:, : max(counts.max(initial=0), 1)], counts
+
+    def candidates_count(self, tile):
+        return self.geometry.popcount(self.candidates[tile[0] * self.size + tile[1]])
+
+    def get_candidates(self, tile):
+        """
+        Returns array of numbers still possible for given tile
+        """
+        return self.geometry.mask_numbers(
+            self.candidates[tile[0] * self.size + tile[1]]
+        )
 
     def update_state(self, upd_tile, tile_num):
-        if len(self.state[upd_tile]) > 0:
-            new_fixed_tiles = []
-            self.board[upd_tile] = tile_num
-            self.state[upd_tile] = {tile_num}
+        """
+        Sets tile_num in upd_tile and removes it from candidates of its peers.
+        Peers left with single candidate are set in turn (depth first),
+        peers left with no candidates are counted as failed
+        """
+        geometry = self.geometry
+        to_update = [(upd_tile[0] * self.size + upd_tile[1], tile_num)]
+        while to_update:
+            tile, num = to_update.pop()
+            if not self.candidates[tile]:
+                continue
+            num_bit = 1 << (int(num) - 1)
+            self.board.flat[tile] = num
+            self.candidates[tile] = num_bit
             self.fixed_count += 1
-            for tile in self.state.keys():
-                if (
-                    tile != upd_tile
-                    and (
-                        tile[0] == upd_tile[0]
-                        or tile[1] == upd_tile[1]
-                        or self.__block_left_up_corner(tile)
-                        == self.__block_left_up_corner(upd_tile)
-                    )
-                    and tile_num in self.state[tile]
-                ):
-                    self.state[tile].remove(tile_num)
-                    if not self.state[tile]:
-                        self.failed_count += 1
-                        self.fixed_count -= 1
-                    elif len(self.state[tile]) == 1:
-                        new_fixed_tiles.append((tile, list(self.state[tile])[0]))
-            for new_fixed in new_fixed_tiles:
-                self.update_state(new_fixed[0], new_fixed[1])
+
+            peers = geometry.peers[tile]
+            peers = peers[(self.candidates[peers] & num_bit) != 0]
+            self.candidates[peers] &= geometry.full_mask ^ num_bit
+            count = geometry.popcount(self.candidates[peers])
+            failed = int(np.count_nonzero(count == 0))
+            self.failed_count += failed
+            self.fixed_count -= failed
+            for new_fixed in peers[count == 1][::-1]:
+                to_update.append(
+                    (new_fixed, int(self.candidates[new_fixed]).bit_length())
+                )
 
     def get_left_numbers(self):
         numbers_left = []
-        for i in NUMBERS:
-            for _ in range(9 - (self.board == i).sum()):
+        for i in range(1, self.size + 1):
+            for _ in range(self.size - (self.board == i).sum()):
                 numbers_left.append(i)
         return numbers_left
 
     def __get_left_in_row(self, row_id):
         numbers_left = []
-        for i in NUMBERS:
+        for i in range(1, self.size + 1):
             if i not in self.board[row_id]:
                 numbers_left.append(i)
         return numbers_left
@@ -141,3 +634,38 @@ class Sudoku(object):
             free_ids[i] = np.where(self.board[i] == 0)[0].tolist()
             nums_left[i] = self.__get_left_in_row(i)
         return free_ids, nums_left
+
+
+class CandidateState(Mapping):
+    """
+    Read-only view of candidates of a sudoku as a mapping
+    from tile (row, col) to set of possible numbers.
+    Contains tiles that were free at start
+    """
+
+    def __init__(self, sudoku):
+        self.sudoku = sudoku
+
+    def __getitem__(self, tile):
+        if tile not in self:
+            raise KeyError(tile)
+        return set(self.sudoku.get_candidates(tile).tolist())
+
+    def __contains__(self, tile):
+        try:
+            row, col = tile
+        except (TypeError, ValueError):
+            return False
+        size = self.sudoku.size
+        return (
+            0 <= row < size
+            and 0 <= col < size
+            and self.sudoku.is_tracked[row * size + col]
+        )
+
+    def __iter__(self):
+        for tile in np.flatnonzero(self.sudoku.is_tracked):
+            yield divmod(int(tile), self.sudoku.size)
+
+    def __len__(self):
+        return np.count_nonzero(self.sudoku.is_tracked)
@@ -0,0 +1,258 @@
+import numpy as np
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+
+sys.path.append("src/")
+from solvers.ga.ga_solver import GeneticAlgorithmSolver
+from solvers.aco.aco_solver import AntColonyOptSolver
+from solvers.exact.exact_solver import ExactSolver
+from solvers.stopping import CACHED, PRESOLVED
+from problem.sudoku_manager import Sudoku, get_corpus, board_path
+from constants import SUDOKU_LEVELS, SEED
+
+ABS_PATH = os.path.dirname(__file__)
+OUTPUT_FILE = os.path.join(ABS_PATH, "../../results/benchmarks/benchmark.json")
+BOARDS_COUNT = 10
+TOLERANCE = 0.1
+
+# Solver configurations to benchmark, "solver" picks the class,
+# the rest are its parameters (ants_count is passed to solve)
+CONFIGS = {
+    "ga": {
+        "solver": "ga",
+        "pop_size": 200,
+        "pc": 0.85,
+        "pm": 0.15,
+        "max_epoch": 300,
+        "reset_condition_val": 75,
+    },
+    "ga_presolve": {
+        "solver": "ga",
+        "pop_size": 200,
+        "pc": 0.85,
+        "pm": 0.15,
+        "max_epoch": 300,
+        "reset_condition_val": 75,
+        "presolve": True,
+    },
+    "aco": {"solver": "aco", "ants_count": 20, "max_epoch": 100},
+    "aco_lockstep": {
+        "solver": "aco",
+        "ants_count": 20,
+        "max_epoch": 100,
+        "engine": "lockstep",
+    },
+    "exact": {"solver": "exact"},
+}
+SOLVERS = {
+    "ga": GeneticAlgorithmSolver,
+    "aco": AntColonyOptSolver,
+    "exact": ExactSolver,
+}
+# Metrics where more is better, the rest of compared metrics are better lower
+HIGHER_IS_BETTER = (
+    "solved_rate",
+    "solves_per_sec",
+    "evaluations_per_sec",
+    "epochs_per_sec",
+    "ant_moves_per_sec",
+)
+LOWER_IS_BETTER = ("median_time", "p95_time", "peak_rss_kb")
+
+
+def count_boards(level):
+    """
+    Returns count of boards of given level, in its corpus or .npy files
+    """
+    corpus = get_corpus(level)
+    if corpus is not None:
+        return len(corpus)
+    count = 0
+    while os.path.exists(board_path(level, count)):
+        count += 1
+    return count
+
+
+def choose_boards(level, boards_count, seed):
+    """
+    Returns ids of boards_count boards of given level, drawn with seed,
+    so every benchmark run solves the same boards
+    """
+    available = count_boards(level)
+    rand_object = np.random.RandomState(seed)
+    board_ids = rand_object.choice(available, min(boards_count, available), False)
+    return sorted(board_ids.tolist())
+
+
+def run_config(config, level, board_ids, seed):
+    """
+    Solves given boards with solver of given config, one at a time.
+    Returns metrics of the run, run in a separate process,
+    so peak RSS is the peak of this config only
+    """
+    params = dict(config)
+    solver_class = SOLVERS[params.pop("solver")]
+    ants_count = params.pop("ants_count", None)
+    if solver_class is not ExactSolver:
+        params["seed"] = seed
+    solver = solver_class(verbose=False, **params)
+
+    times = []
+    solved_times = []
+    epochs = []
+    work = 0
+    # Boards solved by presolve or found in the cache do no search work,
+    # so GA rates count only boards that reached the search, and their time
+    searched_count = 0
+    search_time = 0.0
+    search_epochs = 0
+    for board_id in board_ids:
+        sudoku = Sudoku(level, board_id)
+        start_time = perf_counter()
+        if solver_class is AntColonyOptSolver:
+            solution, score, score_per_epoch, ants_moves = solver.solve(
+                sudoku, ants_count
+            )
+            work += ants_moves
+            is_solved = score == 81
+        elif solver_class is GeneticAlgorithmSolver:
+            solution, score, score_per_epoch, _ = solver.solve(sudoku)
+            is_searched = solver.stop_reason not in (CACHED, PRESOLVED)
+            if is_searched:
+                # Initial population and one population per epoch
+                work += solver.pop_size * (len(score_per_epoch) + 1)
+            is_solved = score == 243
+        else:
+            solution, score, score_per_epoch, nodes_count = solver.solve(sudoku)
+            work += nodes_count
+            is_solved = score == 81
+        elapsed = perf_counter() - start_time
+        times.append(elapsed)
+        epochs.append(len(score_per_epoch))
+        if solver_class is GeneticAlgorithmSolver and is_searched:
+            searched_count += 1
+            search_time += elapsed
+            search_epochs += len(score_per_epoch)
+        if is_solved:
+            solved_times.append(elapsed)
+
+    total_time = sum(times)
+    metrics = {
+        "boards": len(board_ids),
+        "solved": len(solved_times),
+        "solved_rate": len(solved_times) / len(board_ids),
+        "total_time": total_time,
+        "solves_per_sec": len(solved_times) / total_time,
+        "median_time": float(np.median(solved_times)) if solved_times else None,
+        "p95_time": float(np.percentile(solved_times, 95)) if solved_times else None,
+        "mean_epochs": float(np.mean(epochs)),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    if solver_class is GeneticAlgorithmSolver:
+        metrics["searched"] = searched_count
+        if searched_count:
+            metrics["evaluations_per_sec"] = work / search_time
+            metrics["epochs_per_sec"] = search_epochs / search_time
+        else:
+            metrics["evaluations_per_sec"] = None
+            metrics["epochs_per_sec"] = None
+    elif solver_class is AntColonyOptSolver:
+        metrics["ant_moves_per_sec"] = work / total_time
+    else:
+        metrics["nodes_per_sec"] = work / total_time
+    return metrics
+
+
+def run_benchmark(configs, levels, boards_count=BOARDS_COUNT, seed=SEED):
+    """
+    Runs each of configs (names of CONFIGS) on the same boards of each
+    of levels. Returns report: metadata and metrics of each config
+    on each level
+    """
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+            "boards_count": boards_count,
+        },
+        "results": {},
+    }
+    for level in levels:
+        board_ids = choose_boards(level, boards_count, seed)
+        for name in configs:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                metrics = executor.submit(
+                    run_config, CONFIGS[name], level, board_ids, seed
+                ).result()
+            metrics["board_ids"] = board_ids
+            report["results"].setdefault(name, {})[level] = metrics
+            print(
+                f"{name} {level}: solved {metrics['solved']}/{metrics['boards']}, "
+                f"{metrics['solves_per_sec']:.2f} solves/s, "
+                f"median {metrics['median_time']} s"
+            )
+    return report
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """
+    Compares report with baseline report, returns list of regressions:
+    (config, level, metric, baseline value, value) for metrics worse
+    than in baseline by more than tolerance (relative)
+    """
+    regressions = []
+    for name, levels in report["results"].items():
+        for level, metrics in levels.items():
+            baseline_metrics = baseline["results"].get(name, {}).get(level)
+            if baseline_metrics is None:
+                continue
+            for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+                value = metrics.get(metric)
+                baseline_value = baseline_metrics.get(metric)
+                if value is None or baseline_value is None:
+                    continue
+                if metric in HIGHER_IS_BETTER:
+                    is_worse = value < baseline_value * (1 - tolerance)
+                else:
+                    is_worse = value > baseline_value * (1 + tolerance)
+                if is_worse:
+                    regressions.append((name, level, metric, baseline_value, value))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark solvers on the same boards of each level"
+    )
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS))
+    parser.add_argument("--levels", nargs="+", default=list(SUDOKU_LEVELS))
+    parser.add_argument("--boards", type=int, default=BOARDS_COUNT)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--baseline", help="report to compare with")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    report = run_benchmark(args.configs, args.levels, args.boards, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as json_file:
+        json.dump(report, json_file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as json_file:
+            baseline = json.load(json_file)
+        regressions = compare(report, baseline, args.tolerance)
+        for name, level, metric, baseline_value, value in regressions:
+            print(f"REGRESSION {name} {level} {metric}: {baseline_value} -> {value}")
+        if regressions:
+            sys.exit(1)
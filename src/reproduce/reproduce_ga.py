@@ -5,62 +5,34 @@ import os
 import sys
 
 sys.path.append("src/")
-from solvers.ga.ga_solver import GeneticAlgorithmSolver
-from problem.sudoku_manager import Sudoku
-from time import perf_counter
+from reproduce.runner import run_experiment, solve_ga_job
 from statistics import mean
 
 ABS_PATH = os.path.dirname(__file__)
 
+WORKERS = None  # number of processes solving in parallel, None for all cores
 TEST_FILE = "test_ga_nr_15.json"
 
 with open(os.path.join(ABS_PATH, f"../../results/params/ga/{TEST_FILE}")) as json_file:
     params = json.load(json_file)
 
 
-sudokus_range = range(params["start_id"], params["start_id"] + params["num_of_sudokus"])
-
-suds_easy = [Sudoku("easy", id) for id in sudokus_range]
-suds_medium = [Sudoku("medium", id) for id in sudokus_range]
-suds_hard = [Sudoku("hard", id) for id in sudokus_range]
-
-
-solver = GeneticAlgorithmSolver(
-    pop_size=params["pop_size"],
-    pc=params["pc"],
-    pm=params["pm"],
-    max_epoch=params["max_epoch"],
-    reset_condition_val=params["reset_cond"],
-    succession_rate=params["succ_rate"],
-    seed=params["seed"],
-)
-
-
-def test_ga_solver(solver, sudokus, candidates):
+def test_ga_solver(params, level, workers):
     best_chrom_list = []
     best_scores_list = []
     best_per_iters = []
     exec_times = []
-    for i in range(params["num_of_sudokus"]):
-        print(f"Sudoku to solve:\n{sudokus[i].board}\n")
-        for j in range(params["num_of_runs"]):
-            start_time = perf_counter()
-            results = solver.solve(sudoku=sudokus[i], is_candidate_mode=candidates)
-            exec_times.append(perf_counter() - start_time)
-            best_chrom_list.append(results[0])
-            best_scores_list.append(results[1])
-            best_per_iters.append(results[2])
+    for board_id, run_id, results, exec_time in run_experiment(
+        solve_ga_job, params, level=level, workers=workers
+    ):
+        print(f"Board {board_id}, run {run_id}: {results[1]}/243 in {exec_time:.2f}s")
+        exec_times.append(exec_time)
+        best_chrom_list.append(results[0])
+        best_scores_list.append(results[1])
+        best_per_iters.append(results[2])
     return best_chrom_list, best_scores_list, best_per_iters, exec_times
 
 
-best_chroms, best_scores, best_per_iters, exec_times = test_ga_solver(
-    solver, suds_easy, candidates=params["if_candidates"]
-)
-
-
-MAX_STEPS = max([len(bests) for bests in best_per_iters])
-
-
 def normalize_arr(arr):
     if arr.shape[0] == MAX_STEPS:
         return arr
@@ -83,51 +55,53 @@ def normalize_best_per_iters(best_per_iters):
     return best_iters_avg, best_iters_max, best_iters_min
 
 
-best_per_iters_avg, best_per_iters_max, best_per_iters_min = normalize_best_per_iters(
-    best_per_iters
-)
-
+if __name__ == "__main__":
+    best_chroms, best_scores, best_per_iters, exec_times = test_ga_solver(
+        params, "easy", WORKERS
+    )
+    MAX_STEPS = max([len(bests) for bests in best_per_iters])
 
-avg_best_score = mean(best_scores)
+    best_per_iters_avg, best_per_iters_max, best_per_iters_min = (
+        normalize_best_per_iters(best_per_iters)
+    )
 
+    avg_best_score = mean(best_scores)
 
-avg_exec_time = mean(exec_times)
+    avg_exec_time = mean(exec_times)
 
+    params_text = (
+        "pop_size={}, pc={}, pm={}, reset_cond={}, succ_rate={}, candidates={}".format(
+            params["pop_size"],
+            params["pc"],
+            params["pm"],
+            params["reset_cond"],
+            params["succ_rate"],
+            params["if_candidates"],
+        )
+    )
 
-params_text = (
-    "pop_size={}, pc={}, pm={}, reset_cond={}, succ_rate={}, candidates={}".format(
-        params["pop_size"],
-        params["pc"],
-        params["pm"],
-        params["reset_cond"],
-        params["succ_rate"],
-        params["if_candidates"],
+    plt.figure()
+    plt.fill_between(
+        range(MAX_STEPS),
+        best_per_iters_min,
+        best_per_iters_max,
+        color="b",
+        alpha=0.2,
+        label="min to max",
+    )
+    plt.plot(range(MAX_STEPS), (best_per_iters_avg), "r", label="avg best scores")
+    plt.legend(loc="lower right")
+    plt.xlabel("epoch")
+    plt.ylabel("global score")
+    plt.suptitle(
+        "Test nr {} (GA): Przyrost wartości funkcji celu".format(params["test_id"])
+    )
+    plt.title(
+        "Średnia najlepsza wartość: {}, średni czas wykonania: {:.2f}".format(
+            avg_best_score, avg_exec_time
+        )
     )
-)
-
-
-plt.figure()
-plt.fill_between(
-    range(MAX_STEPS),
-    best_per_iters_min,
-    best_per_iters_max,
-    color="b",
-    alpha=0.2,
-    label="min to max",
-)
-plt.plot(range(MAX_STEPS), (best_per_iters_avg), "r", label="avg best scores")
-plt.legend(loc="lower right")
-plt.xlabel("epoch")
-plt.ylabel("global score")
-plt.suptitle(
-    "Test nr {} (GA): Przyrost wartości funkcji celu".format(params["test_id"])
-)
-plt.title(
-    "Średnia najlepsza wartość: {}, średni czas wykonania: {:.2f}".format(
-        avg_best_score, avg_exec_time
+    plt.figtext(
+        0.5, -0.05, params_text, wrap=True, horizontalalignment="center", fontsize=10
     )
-)
-plt.figtext(
-    0.5, -0.05, params_text, wrap=True, horizontalalignment="center", fontsize=10
-)
-plt.show()
+    plt.show()
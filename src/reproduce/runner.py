@@ -0,0 +1,84 @@
+import numpy as np
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+sys.path.append("src/")
+from solvers.ga.ga_solver import GeneticAlgorithmSolver
+from solvers.aco.aco_solver import AntColonyOptSolver
+from problem.sudoku_manager import Sudoku
+
+
+def job_seed(seed, board_id, run_id):
+    """
+    Derives seed of a single (board, run) job from the seed of the test,
+    so results do not depend on which worker runs the job and when
+    """
+    if seed is None:
+        return None
+    return int(np.random.SeedSequence([seed, board_id, run_id]).generate_state(1)[0])
+
+
+def solve_ga_job(params, level, board_id, run_id, verbose=False):
+    solver = GeneticAlgorithmSolver(
+        pop_size=params["pop_size"],
+        pc=params["pc"],
+        pm=params["pm"],
+        max_epoch=params["max_epoch"],
+        reset_condition_val=params["reset_cond"],
+        succession_rate=params["succ_rate"],
+        seed=job_seed(params["seed"], board_id, run_id),
+        presolve=params.get("presolve", False),
+        selection_operator=params.get("selection", "roulette"),
+        tournament_size=params.get("tournament_size", 3),
+        elite_count=params.get("elite_count", 0),
+        diversity_reset=params.get("diversity_reset"),
+        verbose=verbose,
+    )
+    sudoku = Sudoku(level, board_id)
+    start_time = perf_counter()
+    results = solver.solve(sudoku=sudoku, is_candidate_mode=params["if_candidates"])
+    return results, perf_counter() - start_time
+
+
+def solve_aco_job(params, level, board_id, run_id, verbose=False):
+    solver = AntColonyOptSolver(
+        max_epoch=params["max_epoch"],
+        greed_factor=params["greed_factor"],
+        local_pher_factor=params["local_pher_factor"],
+        global_pher_factor=params["global_pher_factor"],
+        evaporation=params["evaporation"],
+        seed=job_seed(params["seed"], board_id, run_id),
+        presolve=params.get("presolve", False),
+        verbose=verbose,
+    )
+    sudoku = Sudoku(level, board_id)
+    start_time = perf_counter()
+    results = solver.solve(sudoku=sudoku, ants_count=params["ants_count"])
+    return results, perf_counter() - start_time
+
+
+def run_job(job, params, level, board_id, run_id, verbose):
+    results, exec_time = job(params, level, board_id, run_id, verbose)
+    return board_id, run_id, results, exec_time
+
+
+def run_experiment(job, params, level=None, workers=None, verbose=False):
+    """
+    Runs job (solve_ga_job or solve_aco_job) for each of params["num_of_runs"]
+    runs on each of params["num_of_sudokus"] boards, spread over a pool
+    of workers processes (all cores by default).
+    Yields (board_id, run_id, results, exec_time) as soon as a job is finished
+    """
+    level = params["sudoku_level"] if level is None else level
+    boards_range = range(
+        params["start_id"], params["start_id"] + params["num_of_sudokus"]
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_job, job, params, level, board_id, run_id, verbose)
+            for board_id in boards_range
+            for run_id in range(params["num_of_runs"])
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,134 @@
+import numpy as np
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+
+sys.path.append("src/")
+from solvers.ga.ga_solver import GeneticAlgorithmSolver
+from solvers.aco.aco_solver import AntColonyOptSolver
+from problem.sudoku_manager import Sudoku, random_board
+from constants import SEED
+
+ABS_PATH = os.path.dirname(__file__)
+OUTPUT_FILE = os.path.join(ABS_PATH, "../../results/benchmarks/scaling.json")
+BLOCK_SIZES = (3, 4, 5)
+BOARDS_COUNT = 3
+EMPTY_SHARE = 0.6
+EPOCHS = 20
+
+# Solver configurations to measure, as in benchmark.py
+CONFIGS = {
+    "ga": {"solver": "ga", "pop_size": 200, "pc": 0.85, "pm": 0.15},
+    "ga_candidates": {
+        "solver": "ga",
+        "pop_size": 200,
+        "pc": 0.85,
+        "pm": 0.15,
+        "is_candidate_mode": True,
+    },
+    "aco": {"solver": "aco", "ants_count": 20},
+    "aco_lockstep": {"solver": "aco", "ants_count": 20, "engine": "lockstep"},
+}
+SOLVERS = {
+    "ga": GeneticAlgorithmSolver,
+    "aco": AntColonyOptSolver,
+}
+
+
+def time_per_epoch(config, block_size, boards_count, epochs, seed):
+    """
+    Solves boards_count random boards of given block size with solver
+    of given config, for at most epochs epochs each (no resets of GA
+    population). Returns mean time of an epoch and count of solved boards
+    """
+    params = dict(config)
+    solver_class = SOLVERS[params.pop("solver")]
+    ants_count = params.pop("ants_count", None)
+    is_candidate_mode = params.pop("is_candidate_mode", False)
+    if solver_class is GeneticAlgorithmSolver:
+        params["reset_condition_val"] = epochs + 1
+    solver = solver_class(max_epoch=epochs, seed=seed, verbose=False, **params)
+
+    total_time = 0.0
+    total_epochs = 0
+    solved = 0
+    for board_id in range(boards_count):
+        board = random_board(block_size, EMPTY_SHARE, seed + board_id)
+        sudoku = Sudoku.from_board(board, board_id=board_id)
+        start_time = perf_counter()
+        if solver_class is AntColonyOptSolver:
+            _, score, score_per_epoch, _ = solver.solve(sudoku, ants_count)
+            solved += int(score == block_size**4)
+        else:
+            _, score, score_per_epoch, _ = solver.solve(sudoku, is_candidate_mode)
+            solved += int(score == 3 * block_size**4)
+        total_time += perf_counter() - start_time
+        total_epochs += len(score_per_epoch)
+    return total_time / max(total_epochs, 1), solved
+
+
+def run_scaling(
+    configs, block_sizes, boards_count=BOARDS_COUNT, epochs=EPOCHS, seed=SEED
+):
+    """
+    Measures time per epoch of each of configs on boards of each
+    of block sizes. Returns report: metadata, time per epoch and its
+    growth against the previous block size, for each config and size
+    """
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+            "boards_count": boards_count,
+            "epochs": epochs,
+            "empty_share": EMPTY_SHARE,
+        },
+        "results": {},
+    }
+    for name in configs:
+        previous_time = None
+        for block_size in block_sizes:
+            epoch_time, solved = time_per_epoch(
+                CONFIGS[name], block_size, boards_count, epochs, seed
+            )
+            growth = None if previous_time is None else epoch_time / previous_time
+            previous_time = epoch_time
+            size = block_size**2
+            report["results"].setdefault(name, {})[f"{size}x{size}"] = {
+                "block_size": block_size,
+                "epoch_time": epoch_time,
+                "growth": growth,
+                "solved": solved,
+            }
+            print(
+                f"{name} {size}x{size}: {1000 * epoch_time:.2f} ms/epoch"
+                + ("" if growth is None else f", x{growth:.1f}")
+            )
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure how time per epoch of solvers grows with board size"
+    )
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS))
+    parser.add_argument("--block-sizes", nargs="+", type=int, default=BLOCK_SIZES)
+    parser.add_argument("--boards", type=int, default=BOARDS_COUNT)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    report = run_scaling(
+        args.configs, args.block_sizes, args.boards, args.epochs, args.seed
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as json_file:
+        json.dump(report, json_file, indent=4)
@@ -1,12 +1,24 @@
 import numpy as np
-import random
-from copy import deepcopy, copy
+from time import perf_counter
 import sys
 
 sys.path.append("src/")
 from solvers.aco.ant import Ant
-from problem.sudoku_manager import Sudoku
-from constants import SIZE
+from solvers.aco.colony import LockstepColony
+from solvers.aco.pheromone import PheromoneStore
+from problem.sudoku_manager import Sudoku, iter_sudokus
+from problem.presolve import presolve_sudoku
+from solvers.observers import observe
+from solvers.reporter import get_reporter
+from solvers.random_source import RandomSource
+from solvers.stopping import (
+    StopConditions,
+    SOLVED,
+    MAX_EPOCH,
+    STOPPED,
+    CACHED,
+    PRESOLVED,
+)
 
 
 class AntColonyOptSolver:
@@ -18,111 +30,261 @@ class AntColonyOptSolver:
         global_pher_factor=0.8,
         evaporation=0.005,
         seed=None,
+        engine="ants",
+        verbose=True,
+        presolve=False,
+        observer=None,
+        reporter=None,
+        time_limit=None,
+        target_score=None,
+        stagnation_window=None,
+        cache=None,
     ):
+        """
+        engine: "ants" moves Ant objects one by one, "lockstep" moves
+        the whole colony at once with array operations (LockstepColony)
+        verbose: print progress of each epoch, if there is no reporter
+        presolve: set tiles found by constraint propagation (presolve_sudoku)
+        before the search, so only the tiles left are searched
+        observer: SolverObserver (e.g. PhaseProfiler) told about phases
+        of each epoch: construction, stepping, best_ant, global_update
+        and after_epoch
+        reporter: ProgressReporter writing messages and trace of solves
+        time_limit, target_score (count of fixed tiles), stagnation_window:
+        early stopping of each solve (see StopConditions), the reason
+        of the end of the last solve is kept in stop_reason
+        cache: SolutionCache looked up before each solve, solutions
+        found are stored in it
+        """
         self.max_epoch = max_epoch
         self.local_pher_factor = local_pher_factor
         self.global_pher_factor = global_pher_factor
         self.greed_factor = greed_factor
         self.evaporation = evaporation
         self.seed = seed
-        if seed is None:
-            self.rand_object = np.random.RandomState()
-            self.rand_choice_obj = random.Random()
-        else:
-            self.rand_object = np.random.RandomState(seed)
-            self.rand_choice_obj = random.Random(seed)
+        if engine not in ("ants", "lockstep"):
+            raise ValueError(f"Unknown engine: {engine}")
+        self.engine = engine
+        self.verbose = verbose
+        self.ants_states = None
+        self.presolve = presolve
+        self.observer = observer
+        self.reporter = reporter
+        self.time_limit = time_limit
+        self.target_score = target_score
+        self.stagnation_window = stagnation_window
+        self.cache = cache
+        self.stop_reason = None
+        self.rand_object = RandomSource(seed)
+
+    def after_epoch(self, epoch, best_ant_board, best_ant_fixed_count):
+        """
+        Called after each epoch with board of the best ant of the epoch.
+        Returning True stops the solver
+        """
+        return False
+
+    def get_ants_states(self, ants_count, state_buffer):
+        """
+        Returns slab of ants states, of the layout of given state buffer
+        of a sudoku, allocated once and reused by following solves
+        """
+        shape = (ants_count, len(state_buffer))
+        dtype = state_buffer.dtype
+        if (
+            self.ants_states is None
+            or self.ants_states.shape != shape
+            or self.ants_states.dtype != dtype
+        ):
+            self.ants_states = np.empty(shape, dtype)
+        return self.ants_states
+
+    def solved_without_search(self, solution, reporter):
+        """
+        Returns results of solve for solution found before the search
+        (by presolve or in cache)
+        """
+        reporter.result("Problem solved. Solution:\n{solution}\n", solution=solution)
+        return solution, solution.size, np.array([solution.size]), 0
 
     def solve(self, sudoku: Sudoku, ants_count):
+        reporter = get_reporter(self.reporter, self.verbose)
+        reporter.start_solve(sudoku.board_id)
+        stop_conditions = StopConditions(
+            self.time_limit, self.target_score, self.stagnation_window
+        )
+        self.stop_reason = None
+        cache_key = None
+        if self.cache is not None:
+            solution, cache_key = self.cache.lookup(sudoku.board)
+            if solution is not None:
+                self.stop_reason = CACHED
+                return self.solved_without_search(solution, reporter)
+        if self.presolve:
+            sudoku = presolve_sudoku(sudoku)
+        geometry = sudoku.geometry
+        if sudoku.fixed_count == geometry.cells:
+            self.stop_reason = PRESOLVED
+            solution = sudoku.board.copy()
+            if cache_key is not None:
+                self.cache.store(cache_key, solution)
+            return self.solved_without_search(solution, reporter)
+
         is_solved = False
-        cells_count = SIZE**2
-        init_val = 1 / cells_count
-        self.pheromone_matrix = np.ones([SIZE, SIZE, SIZE]) * init_val
+        cells_count = geometry.cells
+        self.pheromone = PheromoneStore(
+            1 / cells_count,
+            self.local_pher_factor,
+            self.global_pher_factor,
+            geometry.size,
+        )
 
         ants_moves = 0
-        best_score_per_epoch = []
+        best_score_per_epoch = np.empty(self.max_epoch, dtype=np.intp)
 
         epoch = 1
         solution = None
-        all_tiles = [index for index, _ in np.ndenumerate(sudoku.board)]
-        while epoch < self.max_epoch and not is_solved:
-            ants = []
-            temp_all_tiles = copy(all_tiles)
-            best_pheromone_to_add = 0
-            for ant in range(ants_count):
-                tile = self.rand_choice_obj.choice(temp_all_tiles)
-                temp_all_tiles.remove(tile)
-                ants.append(
-                    Ant(
-                        self.rand_choice_obj,
-                        deepcopy(sudoku),
-                        self.pheromone_matrix,
-                        init_val,
-                        self.local_pher_factor,
-                        self.greed_factor,
-                        tile,
-                    )
-                )
 
-            for _ in range(cells_count):
-                for ant in ants:
-                    if ant.tile_is_valid():
-                        number = ant.choose_value()
-                        ant.propagate_constraints(number)
-                    ant.move_next()
-                    ants_moves += 1
+        # Each ant works on its own row of the slab, the slab is refilled
+        # with the state of given sudoku at the start of every epoch
+        ants_states = self.get_ants_states(ants_count, sudoku.state_buffer)
+        if self.engine == "lockstep":
+            colony = LockstepColony(
+                self.rand_object,
+                ants_states,
+                self.pheromone,
+                self.greed_factor,
+                geometry,
+            )
+        else:
+            # Each ant draws its choices from its own substream
+            ants = [
+                Ant(
+                    rand_object,
+                    sudoku.view(ants_states[ant]),
+                    self.pheromone,
+                    self.greed_factor,
+                )
+                for ant, rand_object in enumerate(self.rand_object.spawn(ants_count))
+            ]
+        while epoch < self.max_epoch and not is_solved:
+            with observe(self.observer, "construction"):
+                ants_states[:] = sudoku.state_buffer
+                best_pheromone_to_add = 0
+                # Ants start on different tiles
+                tiles = self.rand_object.permutation(cells_count)[:ants_count]
+                if self.engine == "lockstep":
+                    colony.place_ants(tiles)
+                else:
+                    for ant, tile in zip(ants, tiles.tolist()):
+                        ant.tile = divmod(tile, geometry.size)
 
-            # Finding best ant
-            best_ant_fixed_count = 0
-            for ant in ants:
-                fixed_count = ant.sudoku.fixed_count
+            with observe(self.observer, "stepping"):
+                if self.engine == "lockstep":
+                    colony.run_epoch()
+                else:
+                    for _ in range(cells_count):
+                        # Local update of values chosen by all ants of a step
+                        tiles = []
+                        numbers = []
+                        for ant in ants:
+                            if ant.tile_is_valid():
+                                number = ant.choose_value()
+                                ant.propagate_constraints(number)
+                                tiles.append(ant.tile_id())
+                                numbers.append(number)
+                            ant.move_next()
+                        if tiles:
+                            self.pheromone.update_local(
+                                np.array(tiles), np.array(numbers)
+                            )
+            ants_moves += cells_count * ants_count
 
-                # Check if best ant for this epoch
-                if fixed_count > best_ant_fixed_count:
-                    best_ant = ant
-                    best_ant_fixed_count = fixed_count
+            with observe(self.observer, "best_ant"):
+                # Finding best ant (the first one with most fixed tiles)
+                best_ant = np.argmax(ants_states[:, geometry.fixed_id])
+                best_ant_fixed_count = int(ants_states[best_ant, geometry.fixed_id])
+                best_ant_failed_count = int(ants_states[best_ant, geometry.failed_id])
+                best_ant_board = ants_states[best_ant, geometry.board_slice].reshape(
+                    geometry.size, geometry.size
+                )
 
                 # Check if is solved
-                if fixed_count == cells_count:
-                    solution = ant.sudoku.board
+                if best_ant_fixed_count == cells_count:
+                    solution = best_ant_board.copy()
                     is_solved = True
-                    break
 
-            if not is_solved:
-                pheromone_to_add = cells_count / (cells_count - best_ant_fixed_count)
-                if pheromone_to_add > best_pheromone_to_add:
-                    solution = best_ant.sudoku.board
-                    best_pheromone_to_add = pheromone_to_add
+                if not is_solved:
+                    pheromone_to_add = cells_count / (
+                        cells_count - best_ant_fixed_count
+                    )
+                    if pheromone_to_add > best_pheromone_to_add:
+                        solution = best_ant_board.copy()
+                        best_pheromone_to_add = pheromone_to_add
 
-            # Global pheromone update
-            self.global_pher_mat_update(solution, best_pheromone_to_add)
+            with observe(self.observer, "global_update"):
+                self.global_pher_mat_update(solution, best_pheromone_to_add)
+                self.pheromone.evaporate(self.evaporation)
 
-            # Evaporation
-            best_pheromone_to_add *= 1 - self.evaporation
-            print(
-                f"EPOCH {epoch}: most fixed = {best_ant.sudoku.fixed_count}, failed count: {best_ant.sudoku.failed_count}"
+            reporter.epoch(
+                epoch,
+                best_ant_fixed_count,
+                "EPOCH {epoch}: most fixed = {fixed}, failed count: {failed}",
+                fixed=best_ant_fixed_count,
+                failed=best_ant_failed_count,
             )
-            best_score_per_epoch.append(best_ant.sudoku.fixed_count)
+            best_score_per_epoch[epoch - 1] = best_ant_fixed_count
             epoch += 1
 
+            with observe(self.observer, "after_epoch"):
+                is_stopped = self.after_epoch(
+                    epoch, best_ant_board, best_ant_fixed_count
+                )
+            if is_stopped:
+                self.stop_reason = STOPPED
+            else:
+                self.stop_reason = stop_conditions.check(best_ant_fixed_count)
+            if self.observer is not None:
+                self.observer.end_epoch(epoch)
+            if self.stop_reason is not None:
+                break
+
         if is_solved:
-            print(f"Problem solved. Solution:\n{solution}\n")
+            self.stop_reason = SOLVED
+            if cache_key is not None:
+                self.cache.store(cache_key, solution)
+            reporter.result(
+                "Problem solved. Solution:\n{solution}\n", solution=solution
+            )
         else:
-            print(f"Unsolved. Best solution:\n{solution}\n")
+            if self.stop_reason is None:
+                self.stop_reason = MAX_EPOCH
+            reporter.result("Unsolved. Best solution:\n{solution}\n", solution=solution)
         return (
             solution,
-            best_ant.sudoku.fixed_count,
-            np.array(best_score_per_epoch),
+            best_ant_fixed_count,
+            best_score_per_epoch[: epoch - 1],
             ants_moves,
         )
 
+    def solve_many(self, boards, ants_count, verbose=False):
+        """
+        Solves each of boards (see iter_sudokus) in turn, reusing buffers
+        and random state of the solver. Yields (board_id, solution, score,
+        epochs, elapsed) as soon as a board is finished, so boards can be
+        a generator of any length. verbose is used only if the solver
+        has no reporter
+        """
+        was_verbose = self.verbose
+        self.verbose = verbose
+        try:
+            for board_id, sudoku in iter_sudokus(boards):
+                start_time = perf_counter()
+                solution, score, score_per_epoch, _ = self.solve(sudoku, ants_count)
+                elapsed = perf_counter() - start_time
+                yield board_id, solution, score, len(score_per_epoch), elapsed
+        finally:
+            self.verbose = was_verbose
+
     def global_pher_mat_update(self, solution, best_pheromone):
-        for row in range(SIZE):
-            for col in range(SIZE):
-                set_value = solution[row, col]
-                if set_value > 0:
-                    self.pheromone_matrix[row, col][set_value - 1] *= (
-                        1 - self.global_pher_factor
-                    )
-                    self.pheromone_matrix[row, col][set_value - 1] += (
-                        self.global_pher_factor * best_pheromone
-                    )
+        self.pheromone.update_global(solution, best_pheromone)
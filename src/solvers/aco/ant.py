@@ -1,10 +1,8 @@
 import sys
-import numpy as np
-import random
 
 sys.path.append("src/")
 from problem.sudoku_manager import Sudoku
-from constants import SIZE
+from solvers.aco.pheromone import PheromoneStore
 
 
 class Ant:
@@ -12,16 +10,12 @@ class Ant:
         self,
         rand_object,
         sudoku: Sudoku,
-        pheromone_mat=None,
-        initial_pher_val=0.0,
-        local_pher_update=0.0,
+        pheromone: PheromoneStore = None,
         greed=1.0,
         tile=(0, 0),
     ):
         self.sudoku = sudoku
-        self.pheromone_mat = pheromone_mat
-        self.initial_pher_val = initial_pher_val
-        self.local_pher_update = local_pher_update
+        self.pheromone = pheromone
         self.greed = greed
         self.tile = tile
         self.rand_object = rand_object
@@ -30,19 +24,19 @@ class Ant:
         new_row = self.tile[0]
         new_col = self.tile[1] + 1
 
-        if new_col >= SIZE:
+        if new_col >= self.sudoku.size:
             new_col = 0
             new_row += 1
-        if new_row >= SIZE:
+        if new_row >= self.sudoku.size:
             new_row = 0
 
         self.tile = (new_row, new_col)
 
     def choose_value(self):
-        pher = self.pheromone_mat[:][self.tile]
+        pher = self.pheromone.values[self.tile_id()]
 
         best_pheromone = 0
-        available_values = np.array(list(self.sudoku.state[self.tile]))
+        available_values = self.sudoku.get_candidates(self.tile)
 
         # Greedy selection
         if self.rand_object.random() > self.greed:
@@ -56,32 +50,17 @@ class Ant:
         else:
             weights = pher[available_values - 1]
 
-            selected_value = self.rand_object.choices(
-                available_values, weights=tuple(weights)
-            )[0]
+            selected_value = available_values[self.rand_object.weighted_ids(weights)]
 
         return selected_value
 
+    def tile_id(self):
+        return self.tile[0] * self.sudoku.size + self.tile[1]
+
     def propagate_constraints(self, tile_num):
+        # Local pheromone update is done by the solver, for all ants at once
         self.sudoku.update_state(self.tile, tile_num)
-        self.update_local(tile_num)
-
-    def update_local(self, tile_num):
-        tile_num -= 1
-        self.pheromone_mat[tile_num][self.tile] = (
-            1 - self.local_pher_update
-        ) * self.pheromone_mat[tile_num][
-            self.tile
-        ] + self.local_pher_update * self.initial_pher_val
 
     def tile_is_valid(self):
-        # print(f"self tile: {self.tile}")
-        if self.tile not in self.sudoku.state.keys():
-            # print("not valid (a)")
-            return False
-        elif len(self.sudoku.state[self.tile]) > 1:
-            # print("valid")
-            return True
-        else:
-            # print("not valid (b)")
-            return False
+        # Tiles occupied at start have no candidates, fixed tiles have one
+        return self.sudoku.candidates_count(self.tile) > 1
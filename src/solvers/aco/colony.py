@@ -0,0 +1,184 @@
+import numpy as np
+import sys
+
+sys.path.append("src/")
+from problem.sudoku_manager import GEOMETRY, Geometry
+from solvers.aco.pheromone import PheromoneStore
+
+
+def get_units(geometry: Geometry):
+    """
+    Returns matrix units[tile, unit] telling if tile belongs to unit
+    (rows, then columns, then blocks), of float type precise enough
+    for sums of unit_sums
+    """
+    set_weight = geometry.size << geometry.size
+    is_precise = geometry.size * (set_weight + geometry.full_mask) < 1 << 24
+    units = np.zeros(
+        (geometry.cells, 3 * geometry.size),
+        dtype=np.float32 if is_precise else np.float64,
+    )
+    units[np.arange(geometry.cells)[:, np.newaxis], geometry.cell_units] = 1
+    return units
+
+
+class LockstepColony:
+    """
+    Colony of ants, that all make their move at the same time.
+    States of all ants are kept in rows of one (ants_count, state_len) array
+    (the layout of Sudoku.state_buffer of given geometry), so each step
+    chooses values
+    and propagates constraints for the whole colony with array operations.
+    Follows the same rules as Ant: greedy choice of value with the highest
+    pheromone with probability 1 - greed, roulette wheel otherwise,
+    local pheromone update of values chosen by all ants after each step
+    """
+
+    def __init__(
+        self,
+        rand_object,
+        ants_states,
+        pheromone: PheromoneStore,
+        greed=1.0,
+        geometry: Geometry = GEOMETRY,
+    ):
+        self.rand_object = rand_object
+        self.ants_states = ants_states
+        self.geometry = geometry
+        self.boards = ants_states[:, geometry.board_slice]
+        self.candidates = ants_states[:, geometry.candidates_slice]
+        self.pheromone = pheromone
+        self.greed = greed
+        self.ants_ids = np.arange(ants_states.shape[0])
+        self.tiles = np.zeros(ants_states.shape[0], dtype=np.intp)
+        self.to_update = np.zeros(
+            (ants_states.shape[0], geometry.cells), dtype=ants_states.dtype
+        )
+        # Sums of single bits over a unit are below set_weight
+        self.units = get_units(geometry)
+        self.set_weight = geometry.size << geometry.size
+
+    def place_ants(self, tiles):
+        self.tiles[:] = tiles
+
+    def move_next(self):
+        self.tiles += 1
+        self.tiles %= self.geometry.cells
+
+    def choose_values(self, tiles, masks):
+        """
+        Chooses value for each given tile out of candidates in masks
+        """
+        weights = self.pheromone.values[tiles] * self.geometry.mask_bits(masks)
+        is_greedy, roulette = self.rand_object.uniform(0, 1, (2, len(tiles)))
+        is_greedy = is_greedy > self.greed
+
+        # Roulette wheel: first value with cumulative weight above the draw
+        cumulative = np.cumsum(weights, axis=1)
+        roulette *= cumulative[:, -1]
+        values_ids = np.count_nonzero(cumulative <= roulette[:, np.newaxis], axis=1)
+        values_ids = np.minimum(values_ids, self.geometry.size - 1)
+
+        values_ids[is_greedy] = np.argmax(weights[is_greedy], axis=1)
+        return values_ids + 1
+
+    def unit_sums(self, to_set):
+        """
+        Sums of bits set in each of 3 * size units (rows, columns, blocks)
+        of each ant, with one matrix product. Each tile holds a single bit,
+        so the sum is a bitwise sum unless some number is set twice
+        in a unit, which shows up as popcount lower than count of tiles
+        """
+        units = (to_set + self.set_weight * (to_set != 0)).astype(
+            self.units.dtype
+        ) @ self.units
+        set_count, units_sum = np.divmod(units.astype(np.intp), self.set_weight)
+        is_conflict = (self.geometry.sums_popcount(units_sum) != set_count).any(axis=1)
+        return units_sum.astype(to_set.dtype), is_conflict
+
+    def propagate_constraints(self, ants, tiles, values):
+        """
+        Sets values in tiles of given ants (one tile per ant) and removes
+        them from candidates of peers. Peers left with single candidate
+        are set all at once in the next wave, until no ant has any left.
+        If two tiles set in one wave share a unit and a number, only the
+        lowest tile of that ant is set, the rest waits for the next wave.
+        Each wave works only on rows of ants that have something to set
+        """
+        geometry = self.geometry
+        size, block_size, cells = geometry.size, geometry.block_size, geometry.cells
+        popcount = geometry.popcount
+        self.to_update[ants, tiles] = 1 << (values - 1)
+        while len(ants):
+            candidates = self.candidates[ants]
+            to_set = self.to_update[ants]
+            self.to_update[ants] = 0
+            to_set *= (candidates & to_set) != 0
+
+            units_sum, is_conflict = self.unit_sums(to_set)
+            if is_conflict.any():
+                conflict_rows = np.flatnonzero(is_conflict)
+                first_tiles = np.argmax(to_set[conflict_rows] != 0, axis=1)
+                first_bits = to_set[conflict_rows, first_tiles]
+                self.to_update[ants[conflict_rows]] = to_set[conflict_rows]
+                self.to_update[ants[conflict_rows], first_tiles] = 0
+                to_set[conflict_rows] = 0
+                to_set[conflict_rows, first_tiles] = first_bits
+                units_sum, _ = self.unit_sums(to_set)
+
+            set_ids = np.flatnonzero(to_set)
+            set_rows, set_tiles = np.divmod(set_ids, cells)
+            set_bits = to_set.ravel()[set_ids]
+            candidates.ravel()[set_ids] = set_bits
+            # Number of a single bit is count of bits below it, plus one
+            self.boards[ants[set_rows], set_tiles] = popcount(set_bits - 1) + 1
+
+            # Each tile gets bits of its row, column and block by broadcasting
+            to_remove = (
+                units_sum[:, :size].reshape(-1, block_size, block_size, 1, 1)
+                | units_sum[:, size : 2 * size].reshape(
+                    -1, 1, 1, block_size, block_size
+                )
+                | units_sum[:, 2 * size :].reshape(-1, block_size, 1, block_size, 1)
+            ).reshape(-1, cells)
+            to_remove.ravel()[set_ids] = 0
+            is_hit = (candidates & to_remove) != 0
+            candidates &= ~to_remove
+            self.candidates[ants] = candidates
+
+            hit_ids = np.flatnonzero(is_hit)
+            hit_rows, hit_tiles = np.divmod(hit_ids, cells)
+            hit_candidates = candidates.ravel()[hit_ids]
+            count = popcount(hit_candidates)
+            failed = np.bincount(hit_rows[count == 0], minlength=len(ants))
+            set_count = np.bincount(set_rows, minlength=len(ants))
+            self.ants_states[ants, geometry.failed_id] += failed.astype(
+                self.ants_states.dtype
+            )
+            self.ants_states[ants, geometry.fixed_id] += (set_count - failed).astype(
+                self.ants_states.dtype
+            )
+            is_single = count == 1
+            self.to_update[ants[hit_rows[is_single]], hit_tiles[is_single]] = (
+                hit_candidates[is_single]
+            )
+            ants = self.ants_ids[self.to_update.any(axis=1)]
+
+    def step(self):
+        """
+        Every ant standing on a tile with more than one candidate
+        chooses its value, then all ants move to the next tile
+        """
+        masks = self.candidates[self.ants_ids, self.tiles]
+        is_valid = self.geometry.popcount(masks) > 1
+        ants = self.ants_ids[is_valid]
+        if len(ants):
+            tiles = self.tiles[is_valid]
+            values = self.choose_values(tiles, masks[is_valid])
+            self.propagate_constraints(ants, tiles, values)
+            self.pheromone.update_local(tiles, values)
+        self.move_next()
+
+    def run_epoch(self):
+        for _ in range(self.geometry.cells):
+            self.step()
@@ -0,0 +1,182 @@
+import numpy as np
+import multiprocessing as mp
+import os
+import queue as queue_module
+import sys
+from multiprocessing import shared_memory
+
+sys.path.append("src/")
+from solvers.aco.aco_solver import AntColonyOptSolver
+from problem.sudoku_manager import Sudoku
+
+
+class ColonySolver(AntColonyOptSolver):
+    """
+    AntColonyOptSolver running one colony of MultiColonySolver.
+    Keeps its best-so-far board in its slot of the shared boards array,
+    and every exchange_interval epochs lays pheromone on best-so-far boards
+    of other colonies, the same way as on its own best board
+    """
+
+    def __init__(
+        self,
+        colony_id,
+        boards,
+        fixed_counts,
+        lock,
+        stop_event,
+        exchange_interval,
+        **aco_params,
+    ):
+        super().__init__(**aco_params)
+        self.colony_id = colony_id
+        self.boards = boards
+        self.fixed_counts = fixed_counts
+        self.lock = lock
+        self.stop_event = stop_event
+        self.exchange_interval = exchange_interval
+
+    def after_epoch(self, epoch, best_ant_board, best_ant_fixed_count):
+        if self.stop_event.is_set():
+            return True
+        if best_ant_fixed_count > self.fixed_counts[self.colony_id]:
+            with self.lock:
+                self.boards[self.colony_id] = best_ant_board.ravel()
+                self.fixed_counts[self.colony_id] = best_ant_fixed_count
+        if epoch % self.exchange_interval:
+            return False
+
+        with self.lock:
+            boards = self.boards.copy()
+            fixed_counts = self.fixed_counts.copy()
+        cells_count = boards.shape[1]
+        for colony_id in range(len(fixed_counts)):
+            fixed_count = fixed_counts[colony_id]
+            if colony_id != self.colony_id and 0 < fixed_count < cells_count:
+                self.global_pher_mat_update(
+                    boards[colony_id].reshape(best_ant_board.shape),
+                    cells_count / (cells_count - fixed_count),
+                )
+        return False
+
+
+def run_colony(colony_id, sudoku, ants_count, shm_name, shape, kwargs, queue):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    fixed_counts = np.ndarray(shape[:1], dtype=np.int16, buffer=shm.buf)
+    boards = np.ndarray(
+        shape, dtype=np.int16, buffer=shm.buf, offset=fixed_counts.nbytes
+    )
+    is_stopping = True
+    try:
+        solver = ColonySolver(
+            colony_id, boards=boards, fixed_counts=fixed_counts, **kwargs
+        )
+        results = solver.solve(sudoku, ants_count)
+        is_stopping = results[1] == sudoku.geometry.cells
+        queue.put((colony_id, results))
+    except Exception as error:
+        queue.put((colony_id, error))
+        raise
+    finally:
+        # Other colonies stop once the sudoku is solved or a colony failed
+        if is_stopping:
+            kwargs["stop_event"].set()
+        del boards, fixed_counts
+        shm.close()
+
+
+class MultiColonySolver:
+    """
+    Runs colonies_count independent colonies of AntColonyOptSolver
+    in separate processes, each with its own seed and pheromone matrix.
+    colonies_params is an optional list of per-colony overrides
+    of aco_params (e.g. different greed_factor or evaporation).
+    Colonies share their best-so-far boards every exchange_interval epochs.
+    Solving stops as soon as any colony fixes all tiles or fails
+    """
+
+    def __init__(
+        self,
+        colonies_count=None,
+        exchange_interval=10,
+        colonies_params=None,
+        seed=None,
+        **aco_params,
+    ):
+        self.colonies_count = colonies_count or os.cpu_count()
+        if colonies_params is not None and len(colonies_params) != self.colonies_count:
+            raise ValueError("colonies_params needs one entry per colony")
+        self.colonies_params = colonies_params or [{}] * self.colonies_count
+        self.exchange_interval = exchange_interval
+        self.seed = seed
+        self.aco_params = aco_params
+
+    def solve(self, sudoku: Sudoku, ants_count, join_timeout=1.0):
+        """
+        Returns results of the best colony, in the shape
+        of AntColonyOptSolver.solve, and results of all colonies that
+        finished. Colonies still running join_timeout seconds after
+        a solution is found are terminated
+        """
+        # Each colony gets its own substream of the seed
+        seeds = np.random.SeedSequence(self.seed).spawn(self.colonies_count)
+        shape = (self.colonies_count, sudoku.geometry.cells)
+        shm = shared_memory.SharedMemory(
+            create=True, size=2 * self.colonies_count * (sudoku.geometry.cells + 1)
+        )
+        np.ndarray(self.colonies_count, dtype=np.int16, buffer=shm.buf)[:] = 0
+        lock = mp.Lock()
+        stop_event = mp.Event()
+        queue = mp.Queue()
+        colonies_results = [None] * self.colonies_count
+        colonies = []
+        try:
+            for colony_id in range(self.colonies_count):
+                kwargs = dict(
+                    self.aco_params,
+                    **self.colonies_params[colony_id],
+                    seed=seeds[colony_id],
+                    lock=lock,
+                    stop_event=stop_event,
+                    exchange_interval=self.exchange_interval,
+                )
+                colony = mp.Process(
+                    target=run_colony,
+                    args=(
+                        colony_id,
+                        sudoku,
+                        ants_count,
+                        shm.name,
+                        shape,
+                        kwargs,
+                        queue,
+                    ),
+                )
+                colony.start()
+                colonies.append(colony)
+
+            for _ in range(self.colonies_count):
+                try:
+                    timeout = join_timeout if stop_event.is_set() else None
+                    colony_id, results = queue.get(timeout=timeout)
+                except queue_module.Empty:
+                    break
+                colonies_results[colony_id] = results
+        finally:
+            stop_event.set()
+            for colony in colonies:
+                colony.join(join_timeout)
+                if colony.is_alive():
+                    colony.terminate()
+                    colony.join()
+            shm.close()
+            shm.unlink()
+
+        for colony_id, results in enumerate(colonies_results):
+            if isinstance(results, Exception):
+                raise RuntimeError(f"Colony {colony_id} failed") from results
+        finished_results = [results for results in colonies_results if results]
+        if not finished_results:
+            raise RuntimeError("No colony finished")
+        best_results = max(finished_results, key=lambda results: results[1])
+        return best_results, colonies_results
@@ -0,0 +1,45 @@
+import numpy as np
+import sys
+
+sys.path.append("src/")
+from constants import SIZE
+
+
+class PheromoneStore:
+    """
+    Pheromone of each value of each tile, kept in one contiguous array
+    values[tile, value - 1] of shape (size**2, size), tile being flat id.
+    All updates take arrays of tiles and values, so they are applied
+    to any number of tiles at once
+    """
+
+    def __init__(self, initial_value, local_factor, global_factor, size=SIZE):
+        self.initial_value = initial_value
+        self.local_factor = local_factor
+        self.global_factor = global_factor
+        self.values = np.full((size**2, size), initial_value)
+
+    def update_local(self, tiles, values):
+        """
+        Moves pheromone of values chosen in tiles towards the initial
+        value, so other ants are less likely to choose the same
+        """
+        values_ids = values - 1
+        self.values[tiles, values_ids] = (1 - self.local_factor) * self.values[
+            tiles, values_ids
+        ] + self.local_factor * self.initial_value
+
+    def update_global(self, board, amount):
+        """
+        Moves pheromone of values set on board (of shape (size, size)
+        or (size**2,), 0 for empty tiles) towards amount
+        """
+        board = np.asarray(board).ravel()
+        tiles = np.flatnonzero(board)
+        values_ids = board[tiles].astype(np.intp) - 1
+        self.values[tiles, values_ids] = (1 - self.global_factor) * self.values[
+            tiles, values_ids
+        ] + self.global_factor * amount
+
+    def evaporate(self, rate):
+        self.values *= 1 - rate
@@ -0,0 +1,164 @@
+import numpy as np
+import sys
+from time import perf_counter
+
+sys.path.append("src/")
+from problem.sudoku_manager import Sudoku, PEERS, FULL_MASK, iter_sudokus
+from solvers.reporter import get_reporter
+from constants import SIZE
+
+# Search works on plain lists of python ints, which are much faster
+# than numpy arrays for single tiles. Tiles hold bitmasks of candidates
+# like Sudoku.candidates, set tiles hold their bit and SET_FLAG
+PEERS_LIST = [tuple(peers) for peers in PEERS.tolist()]
+SET_FLAG = 1 << SIZE
+POPCOUNT_LIST = [bin(mask).count("1") for mask in range(1 << SIZE)]
+
+
+class ExactSolver:
+    """
+    Deterministic solver: constraint propagation (setting tiles left with
+    a single candidate, as in Sudoku.update_state) and depth first search,
+    branching on the free tile with the fewest candidates (MRV),
+    numbers tried in increasing order.
+    Returns the solution of any solvable sudoku, so it is also the ground
+    truth for GeneticAlgorithmSolver and AntColonyOptSolver
+    """
+
+    def __init__(self, max_nodes=None, verbose=True, reporter=None):
+        """
+        max_nodes: search stops after visiting that many nodes (no limit
+        by default)
+        verbose: print the solution, if there is no reporter
+        reporter: ProgressReporter writing the solution
+        """
+        self.max_nodes = max_nodes
+        self.verbose = verbose
+        self.reporter = reporter
+
+    def propagate(self, tiles, to_set):
+        """
+        Sets tiles from to_set (list of (tile, bit)) and removes their bits
+        from candidates of peers. Peers left with a single candidate
+        are set in turn. Returns False if a contradiction is found
+        """
+        while to_set:
+            tile, bit = to_set.pop()
+            mask = tiles[tile]
+            if mask & SET_FLAG:
+                if mask & bit:
+                    continue
+                return False
+            if not mask & bit:
+                return False
+            tiles[tile] = bit | SET_FLAG
+            for peer in PEERS_LIST[tile]:
+                mask = tiles[peer]
+                if mask & bit:
+                    if mask & SET_FLAG:
+                        return False
+                    mask ^= bit
+                    if not mask:
+                        return False
+                    tiles[peer] = mask
+                    if not mask & (mask - 1):
+                        to_set.append((peer, mask))
+        return True
+
+    def choose_tile(self, tiles):
+        """
+        Returns free tile with the fewest candidates (None if all tiles
+        are set) and count of set tiles
+        """
+        best_tile = None
+        best_count = SIZE + 1
+        fixed_count = 0
+        for tile, mask in enumerate(tiles):
+            if mask & SET_FLAG:
+                fixed_count += 1
+            elif POPCOUNT_LIST[mask] < best_count:
+                best_tile = tile
+                best_count = POPCOUNT_LIST[mask]
+        return best_tile, fixed_count
+
+    def search(self, tiles):
+        """
+        Depth first search from propagated tiles. Returns solved tiles
+        (None if there is no solution, or max_nodes was reached),
+        fixed tiles count of each visited node and count of nodes
+        """
+        fixed_per_node = []
+        stack = [(tiles, None, 0)]
+        while stack:
+            if self.max_nodes is not None and len(fixed_per_node) >= self.max_nodes:
+                break
+            tiles, tile, bit = stack.pop()
+            if tile is not None:
+                tiles = tiles.copy()
+                if not self.propagate(tiles, [(tile, bit)]):
+                    continue
+
+            tile, fixed_count = self.choose_tile(tiles)
+            fixed_per_node.append(fixed_count)
+            if tile is None:
+                return tiles, fixed_per_node, len(fixed_per_node)
+
+            # Pushed in reverse, so the lowest number is tried first
+            mask = tiles[tile]
+            bits = [1 << num for num in range(SIZE) if mask >> num & 1]
+            for bit in reversed(bits):
+                stack.append((tiles, tile, bit))
+        return None, fixed_per_node, len(fixed_per_node)
+
+    def solve(self, sudoku: Sudoku):
+        """
+        Solves given sudoku, returns solution (or board of the sudoku
+        if not solved), fixed tiles count, fixed tiles count of each
+        visited search node and count of visited nodes.
+        Works on SIZE x SIZE boards only
+        """
+        if sudoku.size != SIZE:
+            raise ValueError(f"Exact solver works on {SIZE}x{SIZE} boards only")
+        reporter = get_reporter(self.reporter, self.verbose)
+        reporter.start_solve(sudoku.board_id)
+        board = sudoku.board.ravel()
+        tiles = [FULL_MASK] * SIZE**2
+        given = [(tile, 1 << (int(num) - 1)) for tile, num in enumerate(board) if num]
+        solved_tiles = None
+        fixed_per_node = []
+        nodes_count = 0
+        if self.propagate(tiles, given):
+            solved_tiles, fixed_per_node, nodes_count = self.search(tiles)
+
+        if solved_tiles is None:
+            solution = sudoku.board.copy()
+            fixed_count = sudoku.fixed_count
+            reporter.result("Unsolved. Board:\n{solution}\n", solution=solution)
+        else:
+            solution = np.array(
+                [(mask ^ SET_FLAG).bit_length() for mask in solved_tiles],
+                dtype=sudoku.board.dtype,
+            ).reshape(SIZE, SIZE)
+            fixed_count = SIZE**2
+            reporter.result(
+                "Problem solved. Solution:\n{solution}\n", solution=solution
+            )
+        return solution, fixed_count, np.array(fixed_per_node), nodes_count
+
+    def solve_many(self, boards, verbose=False):
+        """
+        Solves each of boards (see iter_sudokus) in turn. Yields
+        (board_id, solution, score, nodes, elapsed) as soon as
+        a board is finished. verbose is used only if the solver
+        has no reporter
+        """
+        was_verbose = self.verbose
+        self.verbose = verbose
+        try:
+            for board_id, sudoku in iter_sudokus(boards):
+                start_time = perf_counter()
+                solution, score, _, nodes_count = self.solve(sudoku)
+                elapsed = perf_counter() - start_time
+                yield board_id, solution, score, nodes_count, elapsed
+        finally:
+            self.verbose = was_verbose
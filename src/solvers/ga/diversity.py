@@ -0,0 +1,20 @@
+import numpy as np
+
+
+def unique_rows(P):
+    """
+    Finds unique chromosomes (rows) of population P by their bytes.
+    Returns ids of the first copy of each unique chromosome and,
+    for each chromosome, position of its copy in these ids
+    """
+    P = np.ascontiguousarray(P).reshape(len(P), -1)
+    rows = P.view(np.dtype((np.void, P.dtype.itemsize * P.shape[1]))).ravel()
+    _, first_ids, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first_ids, inverse.ravel()
+
+
+def unique_share(P):
+    """
+    Share of unique chromosomes in population P
+    """
+    return len(unique_rows(P)[0]) / len(P)
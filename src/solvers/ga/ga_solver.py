@@ -1,10 +1,25 @@
 import numpy as np
 from copy import copy
+from time import perf_counter
 import sys
 
 sys.path.append("src/")
-from problem.sudoku_manager import Sudoku
-from constants import SIZE, BLOCK_SIZE
+from problem.sudoku_manager import Sudoku, iter_sudokus, get_geometry
+from problem.presolve import presolve_sudoku
+from solvers.observers import observe
+from solvers.reporter import get_reporter
+from solvers.random_source import RandomSource
+from solvers.ga.selection import get_selection_operator
+from solvers.ga.diversity import unique_share
+from solvers.stopping import (
+    StopConditions,
+    SOLVED,
+    MAX_EPOCH,
+    STOPPED,
+    CACHED,
+    PRESOLVED,
+)
+from constants import BLOCK_SIZE
 
 
 class GeneticAlgorithmSolver:
@@ -18,44 +33,198 @@ class GeneticAlgorithmSolver:
         reset_condition_val=75,
         succession_rate=1.0,
         seed=None,
+        check_fitness=False,
+        verbose=True,
+        presolve=False,
+        observer=None,
+        reporter=None,
+        time_limit=None,
+        target_score=None,
+        stagnation_window=None,
+        cache=None,
+        selection_operator="roulette",
+        tournament_size=3,
+        elite_count=0,
+        diversity_reset=None,
     ):
+        """
+        check_fitness: debug mode, after each epoch scores kept up to date
+        by apply_changes are checked against evaluate_chrom
+        verbose: print progress of each epoch, if there is no reporter
+        presolve: set tiles found by constraint propagation (presolve_sudoku)
+        before the search, so only the tiles left are searched
+        observer: SolverObserver (e.g. PhaseProfiler) told about phases
+        of each epoch: selection, crossover_mutation, evaluation,
+        after_epoch and reset
+        reporter: ProgressReporter writing messages and trace of solves
+        time_limit, target_score (out of 3 * size**2), stagnation_window:
+        early stopping of each solve (see StopConditions), the reason
+        of the end of the last solve is kept in stop_reason
+        cache: SolutionCache looked up before each solve, solutions
+        found are stored in it
+        selection_operator: "roulette" (fitness proportional), "tournament"
+        (best of tournament_size) or function of scores, count of ids
+        to select and random source, returning selected ids
+        elite_count: count of the best chromosomes kept in each epoch
+        as they are, neither crossed nor mutated
+        diversity_reset: share of unique chromosomes in population,
+        at or below which it is reset before reset_condition_val epochs
+        without improvement (the share of the last epoch is kept in diversity)
+        """
         self.max_epoch = max_epoch
         self.pc = pc
         self.pm = pm
         self.pop_size = pop_size
         self.reset_condition_val = reset_condition_val
         self.succession_rate = succession_rate
-        if seed is None:
-            self.rand_object = np.random.RandomState()
+        if callable(selection_operator):
+            self.select_ids = selection_operator
         else:
-            self.rand_object = np.random.RandomState(seed)
+            self.select_ids = get_selection_operator(
+                selection_operator, tournament_size
+            )
+        self.elite_count = min(elite_count, pop_size)
+        self.check_fitness = check_fitness
+        self.verbose = verbose
+        self.population_buffers = None
+        self.presolve = presolve
+        self.observer = observer
+        self.reporter = reporter
+        self.time_limit = time_limit
+        self.target_score = target_score
+        self.stagnation_window = stagnation_window
+        self.cache = cache
+        self.diversity_reset = diversity_reset
+        self.diversity = None
+        self.stop_reason = None
+        self.unit_counts = None
+        self.scores = None
+        self.set_geometry(get_geometry(BLOCK_SIZE))
+        self.rand_object = RandomSource(seed)
+
+    def set_geometry(self, geometry):
+        """
+        A method to set size of solved boards (see Geometry),
+        chromosomes are flat boards of geometry.cells tiles
+        and the best score is 3 * geometry.cells
+        """
+        self.geometry = geometry
+        self.size = geometry.size
+        self.block_size = geometry.block_size
+        self.max_score = 3 * geometry.cells
+        # Row, column and block of each tile, as ids of units in the counts
+        # table of a chromosome (see count_digits), and without rows
+        self.cell_units = geometry.cell_units.astype(np.int32)
+        self.col_block_units = np.ascontiguousarray(self.cell_units[:, 1:])
+        self.digits = np.arange(self.size + 1, dtype=np.int8)
 
     def generate_chrom(self, is_candidate_mode=False):
         """
         A method to generate chromosome as initial sudoku board.
         Generated chromosome repects constraints for each row
-        (row contains all unique numbers 1, 2, 3.. 9).
+        (row contains all unique numbers 1, 2, 3.. size).
         Sudoku constraints for columns and block are not applied
         """
-        chrom = copy(self.sudoku.board)
-        if is_candidate_mode:
-            for tile in self.sudoku_state:
-                chrom[tile] = self.rand_object.choice(list(self.sudoku_state[tile]))
-            return chrom
+        chrom = np.empty((1, self.geometry.cells), dtype=np.int8)
+        self.generate_population(is_candidate_mode, out=chrom)
+        return chrom.reshape(self.size, self.size)
 
-        for row_id in range(chrom.shape[0]):
-            left_in_row = copy(self.sudoku.nums_left[row_id])
-            self.rand_object.shuffle(left_in_row)
-            for i in range(len(chrom[row_id])):
-                if chrom[row_id, i] == 0:
-                    chrom[row_id, i] = left_in_row.pop()
-        return chrom
+    def get_population_buffers(self):
+        """
+        Returns two population buffers, allocated once and reused
+        by following solves
+        """
+        shape = (2, self.pop_size, self.geometry.cells)
+        if self.population_buffers is None or self.population_buffers.shape != shape:
+            self.population_buffers = np.empty(shape, dtype=np.int8)
+        return self.population_buffers
 
-    def generate_population(self, is_candidate_mode):
+    def generate_population(self, is_candidate_mode, out=None):
         """
         A method to generate population zero based on self.pop_size
+        (or as many chromosomes as out has rows), all at once.
+        Population is stored as one array of shape (pop_size, size**2),
+        each row is a flattened chromosome. Chromosomes are made
+        as by generate_chrom
+        """
+        if out is None:
+            out = np.empty((self.pop_size, self.geometry.cells), dtype=np.int8)
+        count = out.shape[0]
+        out[:] = self.sudoku.board.ravel()
+        if is_candidate_mode:
+            ids = np.broadcast_to(
+                np.arange(len(self.candidates_tiles)),
+                (count, len(self.candidates_tiles)),
+            )
+            out[:, self.candidates_tiles] = self.draw_candidates(ids)
+            return out
+
+        # Numbers left in each row shuffled by sorting random keys,
+        # keys of padding are 1 so it stays at the end
+        keys = self.rand_object.uniform(0, 1, (count,) + self.empty_ids.shape)
+        keys[:, ~self.is_empty] = 1.0
+        order = np.argsort(keys, axis=2)
+        numbers = np.take_along_axis(
+            np.broadcast_to(self.left_numbers, keys.shape), order, axis=2
+        )
+        out[:, self.empty_ids[self.is_empty]] = numbers[:, self.is_empty]
+        return out
+
+    def set_free_tiles(self):
+        """
+        A method to build padded table of free tiles in each row
+        (as flat ids of tiles) out of self.sudoku.free_tiles,
+        used by row-swap mutation
+        """
+        max_free = max(len(tiles) for tiles in self.sudoku.free_tiles.values())
+        self.free_ids = np.zeros((self.size, max(max_free, 1)), dtype=np.intp)
+        self.free_count = np.zeros(self.size, dtype=np.intp)
+        for row_id, tiles in self.sudoku.free_tiles.items():
+            self.free_ids[row_id, : len(tiles)] = row_id * self.size + np.array(
+                tiles, dtype=np.intp
+            )
+            self.free_count[row_id] = len(tiles)
+
+    def set_left_numbers(self):
+        """
+        A method to build padded tables of empty tiles of each row
+        (as flat ids of tiles) and of numbers missing in each row,
+        used by generate_population
+        """
+        board = self.sudoku.board
+        is_empty = board == 0
+        width = max(int(is_empty.sum(axis=1).max()), 1)
+        rows = np.arange(self.size)[:, np.newaxis]
+        # Empty tiles and missing numbers moved to the front of each row
+        self.empty_ids = (
+            np.argsort(~is_empty, axis=1, kind="stable")[:, :width] + rows * self.size
+        )
+        self.is_empty = np.arange(width) < is_empty.sum(axis=1)[:, np.newaxis]
+        is_present = np.zeros((self.size, self.size + 1), dtype=bool)
+        is_present[rows, board] = True
+        self.left_numbers = (
+            np.argsort(is_present[:, 1:], axis=1, kind="stable")[:, :width] + 1
+        )
+
+    def set_candidates_table(self):
+        """
+        A method to keep padded table of candidates of free tiles
+        (see Sudoku.get_candidates_table), used by candidate mode
+        """
+        (
+            self.candidates_tiles,
+            self.candidates_table,
+            self.candidates_counts,
+        ) = self.sudoku.get_candidates_table()
+
+    def draw_candidates(self, ids):
         """
-        return [self.generate_chrom(is_candidate_mode) for _ in range(self.pop_size)]
+        A method to draw a random candidate for each of given ids
+        of free tiles (rows of the candidates table), ids can be
+        an array of any shape
+        """
+        draws = self.rand_object.integers(0, self.candidates_counts[ids])
+        return self.candidates_table[ids, draws]
 
     def evaluate_chrom(self, chrom):
         """
@@ -71,11 +240,12 @@ class GeneticAlgorithmSolver:
             unique_count_col = len(np.unique(col))
             unique_count += unique_count_col
 
-        for i in range(BLOCK_SIZE):
-            for j in range(BLOCK_SIZE):
+        block_size = self.block_size
+        for i in range(block_size):
+            for j in range(block_size):
                 block = chrom[
-                    i * BLOCK_SIZE : i * BLOCK_SIZE + BLOCK_SIZE,
-                    j * BLOCK_SIZE : j * BLOCK_SIZE + BLOCK_SIZE,
+                    i * block_size : i * block_size + block_size,
+                    j * block_size : j * block_size + block_size,
                 ]
 
                 unique_count_block = len(np.unique(block))
@@ -83,6 +253,140 @@ class GeneticAlgorithmSolver:
 
         return unique_count
 
+    def count_digits(self, P):
+        """
+        A method to count each number (0 for empty tile) in each unit
+        (rows, then columns, then blocks) of each chromosome at once,
+        with numbers one-hot encoded.
+        P is an array of shape (pop_size, size, size) or (pop_size, size**2),
+        returns array of shape (pop_size, 3 * size, size + 1).
+        """
+        size, block_size = self.size, self.block_size
+        P = np.asarray(P, dtype=np.int8).reshape(-1, size, size)
+        one_hot = P[..., np.newaxis] == self.digits
+        blocks = one_hot.reshape(
+            -1, block_size, block_size, block_size, block_size, size + 1
+        )
+        return np.concatenate(
+            (
+                one_hot.sum(axis=2, dtype=np.int8),
+                one_hot.sum(axis=1, dtype=np.int8),
+                blocks.sum(axis=(2, 4), dtype=np.int8).reshape(-1, size, size + 1),
+            ),
+            axis=1,
+        )
+
+    def count_unique(self, P):
+        """
+        A method to count unique numbers in rows, columns and blocks
+        for whole population at once. Returns three arrays of shape (pop_size,).
+        """
+        size = self.size
+        is_present = self.count_digits(P) > 0
+        rows_count = is_present[:, :size].sum(axis=(1, 2))
+        cols_count = is_present[:, size : 2 * size].sum(axis=(1, 2))
+        blocks_count = is_present[:, 2 * size :].sum(axis=(1, 2))
+        return rows_count, cols_count, blocks_count
+
+    def evaluate_population(self, P):
+        """
+        A method to evaluate whole population at once.
+        Gives the same scores as evaluate_chrom applied to each chromosome.
+        """
+        rows_count, cols_count, blocks_count = self.count_unique(P)
+        return rows_count + cols_count + blocks_count
+
+    def init_fitness(self, P):
+        """
+        A method to build tables of numbers counts in units of whole
+        population (kept up to date later by apply_changes)
+        and their scores
+        """
+        self.unit_counts = self.count_digits(P)
+        self.spare_unit_counts = np.empty_like(self.unit_counts)
+        self.id_positions = np.empty(self.unit_counts.size, dtype=np.int32)
+        self.scores = np.count_nonzero(self.unit_counts, axis=(1, 2))
+        return self.scores
+
+    def refresh_fitness(self, P, chrom_ids):
+        """
+        A method to recount tables and scores of given chromosomes,
+        after they were replaced in P
+        """
+        self.unit_counts[chrom_ids] = self.count_digits(P[chrom_ids])
+        self.scores[chrom_ids] = np.count_nonzero(
+            self.unit_counts[chrom_ids], axis=(1, 2)
+        )
+
+    def apply_changes(self, chrom_ids, tiles, old_nums, new_nums, update_rows=True):
+        """
+        A method to update tables and scores after given tiles of given
+        chromosomes changed from old_nums to new_nums. Only counts of the row,
+        column and block of each tile change, and a score changes only
+        by counts going from 0 to 1 or back, so the population is never
+        evaluated from scratch. Without update_rows, counts of rows
+        are left to the caller (numbers were swapped within rows,
+        or whole rows were swapped)
+        """
+        if self.unit_counts is None:
+            return
+        is_changed = old_nums != new_nums
+        if not is_changed.all():
+            chrom_ids, tiles, old_nums, new_nums = (
+                np.compress(is_changed, values)
+                for values in (chrom_ids, tiles, old_nums, new_nums)
+            )
+        if len(chrom_ids) == 0:
+            return
+        units = self.cell_units if update_rows else self.col_block_units
+        units = np.take(units, tiles, axis=0)
+        chrom_offsets = chrom_ids.astype(np.int32) * 3 * self.size
+        units += chrom_offsets[:, np.newaxis]
+        units *= self.size + 1
+        old_ids = (units + old_nums[:, np.newaxis]).ravel()
+        new_ids = (units + new_nums[:, np.newaxis]).ravel()
+
+        counts = self.unit_counts.reshape(-1)
+        was_absent = np.take(counts, new_ids) == 0
+        np.subtract.at(counts, old_ids, np.int8(1))
+        np.add.at(counts, new_ids, np.int8(1))
+        # Each tile changes once, so removed numbers were present before:
+        # counts of old numbers left at 0 are gone, counts of new numbers
+        # absent before and present now are new
+        gone_ids = np.compress(np.take(counts, old_ids) == 0, old_ids)
+        new_ids = np.compress(was_absent & (np.take(counts, new_ids) > 0), new_ids)
+        chrom_size = self.unit_counts[0].size
+        pop_size = len(self.scores)
+        self.scores += np.bincount(
+            self.unique_ids(new_ids) // chrom_size, minlength=pop_size
+        )
+        self.scores -= np.bincount(
+            self.unique_ids(gone_ids) // chrom_size, minlength=pop_size
+        )
+
+    def unique_ids(self, ids):
+        """
+        Returns ids of counts without repetitions (in no particular
+        order): the last position of an id written to the scratch table
+        is its only position read back
+        """
+        positions = np.arange(len(ids), dtype=np.int32)
+        self.id_positions[ids] = positions
+        return np.compress(np.take(self.id_positions, ids) == positions, ids)
+
+    def verify_fitness(self, P):
+        """
+        Debug check of scores kept by apply_changes against evaluate_chrom
+        """
+        full_scores = np.array(
+            [self.evaluate_chrom(chrom.reshape(self.size, self.size)) for chrom in P]
+        )
+        if not np.array_equal(full_scores, self.scores):
+            wrong_ids = np.flatnonzero(full_scores != self.scores)
+            raise RuntimeError(
+                f"Delta fitness differs from evaluate_chrom for chromosomes {wrong_ids}"
+            )
+
     def get_parameters(self):
         params = {
             "max_epoch": self.max_epoch,
@@ -94,92 +398,198 @@ class GeneticAlgorithmSolver:
         }
         return params
 
-    def find_best(self, P, scores):
+    def find_best(self, P, scores=None):
         """
         P, scores are np.arrays
         """
+        if scores is None:
+            scores = self.evaluate_population(P)
         id_max = np.argmax(scores)
         x_best = P[id_max]
         score_best = scores[id_max]
         return x_best, score_best
 
-    def selection(self, P, scores, is_candidate_mode=False):
+    def selection(self, P, scores=None, is_candidate_mode=False, out=None):
         """
-        Shifting the score, so there cannot be negative value
-        Selecting better scores with higher probability
+        Selects next population with the selection operator, after
+        elite_count best chromosomes kept in its first rows. Chromosomes,
+        their counts and scores are gathered at once, nothing is evaluated.
+        With succession_rate below 1, the last rows are replaced
+        by new random chromosomes
         """
-        scores = scores - np.amin(scores)
-        probability = scores / np.amax(scores)
-        probability = probability / np.sum(probability)
-        ids = np.array([i for i in range(self.pop_size)])
-        selected_ids = self.rand_object.choice(ids, self.pop_size, p=probability)
-        P_selected = np.array([P[ids[i]] for i in selected_ids])
+        if scores is None:
+            scores = self.evaluate_population(P)
+        selected_ids = self.select_ids(
+            scores, self.pop_size - self.elite_count, self.rand_object
+        )
+        if self.elite_count:
+            elite_ids = np.argpartition(scores, -self.elite_count)[-self.elite_count :]
+            selected_ids = np.concatenate((elite_ids, selected_ids))
+        P_selected = np.take(P, selected_ids, axis=0, out=out)
+        if self.unit_counts is not None:
+            np.take(self.unit_counts, selected_ids, axis=0, out=self.spare_unit_counts)
+            self.unit_counts, self.spare_unit_counts = (
+                self.spare_unit_counts,
+                self.unit_counts,
+            )
+            self.scores = scores[selected_ids]
         if self.succession_rate < 1:
-            random_rate = 1 - self.succession_rate
-            for i in range(int(random_rate * self.pop_size)):
-                P_selected[i] = self.generate_chrom(is_candidate_mode)
+            random_count = min(
+                int((1 - self.succession_rate) * self.pop_size),
+                self.pop_size - self.elite_count,
+            )
+            random_ids = np.arange(self.pop_size - random_count, self.pop_size)
+            self.generate_population(is_candidate_mode, out=P_selected[random_ids[0] :])
+            if self.unit_counts is not None:
+                self.refresh_fitness(P_selected, random_ids)
         return P_selected
 
-    def mutate(self, chrom, is_candidate_mode):
+    def mutate(self, P, is_candidate_mode):
+        """
+        Mutates whole population in place. Each row of each chromosome
+        is mutated with probability self.pm by swapping two of its free tiles.
+        In candidate mode each free tile of each chromosome is mutated
+        with probability self.pm by drawing one of its candidates
+        """
         if is_candidate_mode:
-            for tile in self.sudoku_state:
-                if self.rand_object.uniform(0, 1) < self.pm:  # if row is to mutate
-                    chrom[tile] = self.rand_object.choice(list(self.sudoku_state[tile]))
-            return chrom
+            free_count = len(self.candidates_tiles)
+            is_mutated = self.rand_object.uniform(0, 1, (P.shape[0], free_count))
+            is_mutated = is_mutated < self.pm
+            is_mutated[: self.elite_count] = False
+            chrom_ids, ids = np.nonzero(is_mutated)
+            tiles = self.candidates_tiles[ids]
+            old_nums = P[chrom_ids, tiles]
+            new_nums = self.draw_candidates(ids)
+            P[chrom_ids, tiles] = new_nums
+            self.apply_changes(chrom_ids, tiles, old_nums, new_nums)
+            return P
+
+        is_mutated = self.rand_object.uniform(0, 1, (P.shape[0], self.size)) < self.pm
+        is_mutated &= self.free_count >= 2
+        is_mutated[: self.elite_count] = False
+        chrom_ids, row_ids = np.nonzero(is_mutated)
+        count = self.free_count[row_ids]
+
+        # Two different free tiles of a row, drawn without a rejection loop
+        tile_a_id = (self.rand_object.uniform(0, 1, len(row_ids)) * count).astype(
+            np.intp
+        )
+        tile_b_id = (self.rand_object.uniform(0, 1, len(row_ids)) * (count - 1)).astype(
+            np.intp
+        )
+        tile_b_id += tile_b_id >= tile_a_id
+
+        tile_a = self.free_ids[row_ids, tile_a_id]
+        tile_b = self.free_ids[row_ids, tile_b_id]
+        numbers_a = P[chrom_ids, tile_a]
+        numbers_b = P[chrom_ids, tile_b]
+        P[chrom_ids, tile_a] = numbers_b
+        P[chrom_ids, tile_b] = numbers_a
+        self.apply_changes(
+            np.concatenate((chrom_ids, chrom_ids)),
+            np.concatenate((tile_a, tile_b)),
+            np.concatenate((numbers_a, numbers_b)),
+            np.concatenate((numbers_b, numbers_a)),
+            update_rows=False,
+        )
+        return P
 
-        row_iterator = 0
-        for row in chrom:
-            if self.rand_object.uniform(0, 1) < self.pm:  # if row is to mutate
-                available_tiles_row = self.sudoku.free_tiles[row_iterator]
-                if len(available_tiles_row) >= 2:
-                    tile_a_id = self.rand_object.choice(available_tiles_row)
-                    tile_b_id = self.rand_object.choice(available_tiles_row)
-                    while tile_a_id == tile_b_id:
-                        tile_b_id = self.rand_object.choice(available_tiles_row)
-                    temp_number = row[tile_a_id]
-                    row[tile_a_id] = row[tile_b_id]
-                    row[tile_b_id] = temp_number
-            row_iterator += 1
-        return chrom
-
-    def cross(self, chrom_a, chrom_b):
-        if self.rand_object.uniform(0, 1) < self.pc:  # if pair is to cross
-            slice_p_1 = self.rand_object.randint(0, chrom_a.shape[0])
-            slice_p_2 = self.rand_object.randint(0, chrom_a.shape[0])
-            while slice_p_1 == slice_p_2:
-                slice_p_2 = self.rand_object.randint(1, chrom_a.shape[0])
-            if slice_p_2 < slice_p_1:
-                slice_p_temp = slice_p_1
-                slice_p_1 = slice_p_2
-                slice_p_2 = slice_p_temp
-
-            temp_a = copy(chrom_a[slice_p_1:slice_p_2])
-            chrom_a[slice_p_1:slice_p_2] = chrom_b[slice_p_1:slice_p_2]
-            chrom_b[slice_p_1:slice_p_2] = temp_a
-        return chrom_a, chrom_b
+    def cross(self, P, pairs):
+        """
+        Crosses given pairs of chromosomes in place. Each pair is crossed
+        with probability self.pc by swapping rows between two different
+        slice points
+        """
+        pairs_count = pairs.shape[0]
+        is_crossed = self.rand_object.uniform(0, 1, pairs_count) < self.pc
+        slice_p_1 = self.rand_object.integers(0, self.size, pairs_count)
+        slice_p_2 = self.rand_object.integers(0, self.size - 1, pairs_count)
+        slice_p_2 += slice_p_2 >= slice_p_1
+        slice_p_min = np.minimum(slice_p_1, slice_p_2)
+        slice_p_max = np.maximum(slice_p_1, slice_p_2)
+
+        rows = np.arange(self.size)
+        rows_swapped = (
+            is_crossed[:, np.newaxis]
+            & (rows >= slice_p_min[:, np.newaxis])
+            & (rows < slice_p_max[:, np.newaxis])
+        )
+        tiles_swapped = np.repeat(rows_swapped, self.size, axis=1)
+
+        chrom_a = P[pairs[:, 0]]
+        chrom_b = P[pairs[:, 1]]
+        P[pairs[:, 0]] = np.where(tiles_swapped, chrom_b, chrom_a)
+        P[pairs[:, 1]] = np.where(tiles_swapped, chrom_a, chrom_b)
+        self.swap_row_counts(pairs, rows_swapped)
+
+        pair_ids, tiles = np.nonzero(tiles_swapped & (chrom_a != chrom_b))
+        numbers_a = chrom_a[pair_ids, tiles]
+        numbers_b = chrom_b[pair_ids, tiles]
+        self.apply_changes(
+            np.concatenate((pairs[pair_ids, 0], pairs[pair_ids, 1])),
+            np.concatenate((tiles, tiles)),
+            np.concatenate((numbers_a, numbers_b)),
+            np.concatenate((numbers_b, numbers_a)),
+            update_rows=False,
+        )
+        return P
+
+    def swap_row_counts(self, pairs, rows_swapped):
+        """
+        A method to swap counts of rows swapped between pairs
+        of chromosomes by cross, with their parts of scores
+        """
+        if self.unit_counts is None:
+            return
+        pair_ids, rows = np.nonzero(rows_swapped)
+        chroms_a, chroms_b = pairs[pair_ids, 0], pairs[pair_ids, 1]
+        counts_a = self.unit_counts[chroms_a, rows]
+        counts_b = self.unit_counts[chroms_b, rows]
+        self.unit_counts[chroms_a, rows] = counts_b
+        self.unit_counts[chroms_b, rows] = counts_a
+        score_changes = np.count_nonzero(counts_b, axis=1) - np.count_nonzero(
+            counts_a, axis=1
+        )
+        pop_size = len(self.scores)
+        self.scores += np.bincount(
+            chroms_a, weights=score_changes, minlength=pop_size
+        ).astype(self.scores.dtype)
+        self.scores -= np.bincount(
+            chroms_b, weights=score_changes, minlength=pop_size
+        ).astype(self.scores.dtype)
 
     def crossover_mutation(self, P, is_candidate_mode):
         """
         Function, that performs crossover for given population
-        and then mutates each chromosome, both with given probability
+        and then mutates each chromosome, both with given probability.
+        Elite chromosomes (first elite_count rows) are left as they are
         """
-        pairs = []
-        ids = [i for i in range(self.pop_size)]
-        while ids:
-            rand1 = ids.pop(self.rand_object.randint(0, len(ids)))
-            rand2 = ids.pop(self.rand_object.randint(0, len(ids)))
-            pair = rand1, rand2
-            pairs.append(pair)
-
-        P_crossed = P
-        for pair in pairs:
-            P_crossed[pair[0]], P_crossed[pair[1]] = self.cross(P[pair[0]], P[pair[1]])
+        pairs_count = (self.pop_size - self.elite_count) // 2
+        pairs = (
+            self.elite_count
+            + self.rand_object.permutation(self.pop_size - self.elite_count)[
+                : 2 * pairs_count
+            ]
+        )
+        P_crossed = self.cross(P, pairs.reshape(pairs_count, 2))
+        P_mutated = self.mutate(P_crossed, is_candidate_mode)
+        return P_mutated
 
-        P_mutated = P_crossed
-        for chrom_id in range(self.pop_size):
-            P_mutated[chrom_id] = self.mutate(P_mutated[chrom_id], is_candidate_mode)
+    def after_epoch(self, epoch, P, scores):
+        """
+        Called after each epoch with current population and its scores,
+        both can be modified in place. Returning True stops the solver
+        """
+        return False
 
-        return P_mutated
+    def solved_without_search(self, solution, reporter):
+        """
+        Returns results of solve for solution found before the search
+        (by presolve or in cache)
+        """
+        reporter.result("Problem solved. Solution:\n{solution}\n", solution=solution)
+        max_score = 3 * solution.size
+        return solution, max_score, np.array([max_score]), [(solution, max_score)]
 
     def solve(self, sudoku: Sudoku, is_candidate_mode=False):
         """
@@ -187,12 +597,32 @@ class GeneticAlgorithmSolver:
         returnes globally best vector of decision, score
         and best score per iteration (for plotting)
         """
+        reporter = get_reporter(self.reporter, self.verbose)
+        reporter.start_solve(sudoku.board_id)
+        stop_conditions = StopConditions(
+            self.time_limit, self.target_score, self.stagnation_window
+        )
+        self.stop_reason = None
+        cache_key = None
+        if self.cache is not None:
+            solution, cache_key = self.cache.lookup(sudoku.board)
+            if solution is not None:
+                self.stop_reason = CACHED
+                return self.solved_without_search(solution, reporter)
+        if self.presolve:
+            sudoku = presolve_sudoku(sudoku)
+        if sudoku.fixed_count == sudoku.geometry.cells:
+            self.stop_reason = PRESOLVED
+            solution = sudoku.board.copy()
+            if cache_key is not None:
+                self.cache.store(cache_key, solution)
+            return self.solved_without_search(solution, reporter)
+
+        self.set_geometry(sudoku.geometry)
         self.sudoku = copy(sudoku)
-        self.sudoku_state = self.sudoku.state
-
-        def get_scores(P):
-            scores = np.array([self.evaluate_chrom(x) for x in P])
-            return scores
+        self.set_free_tiles()
+        self.set_left_numbers()
+        self.set_candidates_table()
 
         epoch = 0
         best_score_global = 0
@@ -200,57 +630,134 @@ class GeneticAlgorithmSolver:
         reset_history = []
         is_solved = False
 
-        P_epoch = self.generate_population(is_candidate_mode)
-        P_epoch_scores = get_scores(P_epoch)
+        # Two population buffers, swapped after each selection
+        P_epoch, P_next = self.get_population_buffers()
+        P_epoch = self.generate_population(is_candidate_mode, out=P_epoch)
+        P_epoch_scores = self.init_fitness(P_epoch)
 
-        best_score_per_epoch = []
+        best_score_per_epoch = np.empty(self.max_epoch, dtype=np.intp)
 
         while epoch < self.max_epoch and not is_solved:
-            P_epoch_selected = self.selection(
-                P_epoch, P_epoch_scores, is_candidate_mode
-            )
-            P_epoch_mutated = self.crossover_mutation(
-                P_epoch_selected, is_candidate_mode
-            )
+            with observe(self.observer, "selection"):
+                P_epoch_selected = self.selection(
+                    P_epoch, P_epoch_scores, is_candidate_mode, out=P_next
+                )
+            with observe(self.observer, "crossover_mutation"):
+                P_epoch_mutated = self.crossover_mutation(
+                    P_epoch_selected, is_candidate_mode
+                )
+            P_next = P_epoch
             P_epoch = P_epoch_mutated
 
-            P_epoch_scores = get_scores(P_epoch)
-            best_chrom_local, best_score_local = self.find_best(P_epoch, P_epoch_scores)
+            with observe(self.observer, "evaluation"):
+                # Scores kept up to date by selection, cross and mutate
+                P_epoch_scores = self.scores
+                if self.check_fitness:
+                    self.verify_fitness(P_epoch)
+                best_chrom_local, best_score_local = self.find_best(
+                    P_epoch, P_epoch_scores
+                )
+                if self.diversity_reset is not None:
+                    self.diversity = unique_share(P_epoch)
 
             if best_score_local > best_score_global:
-                best_chrom_global = best_chrom_local
+                best_chrom_global = best_chrom_local.reshape(
+                    self.size, self.size
+                ).copy()
                 best_score_global = best_score_local
-                if best_score_global == 3 * SIZE**2:
+                if best_score_global == self.max_score:
                     reset_history.append((best_chrom_global, best_score_global))
                     is_solved = True
                 else:
-                    print(f"Improvement! Score: {best_score_global}/243")
+                    reporter.event(
+                        "Improvement! Score: {score}/{max_score}",
+                        score=best_score_global,
+                        max_score=self.max_score,
+                    )
                 reset_condition = 0
 
-            print(
-                f"Epoch: {epoch} best_global: {best_score_global}/243, best_local: {best_score_local}/243"
+            reporter.epoch(
+                epoch,
+                best_score_global,
+                "Epoch: {epoch} best_global: {best_global}/{max_score}, best_local: {best_local}/{max_score}",
+                best_global=best_score_global,
+                best_local=best_score_local,
+                max_score=self.max_score,
             )
-
-            best_score_per_epoch.append(best_score_global)
+            best_score_per_epoch[epoch] = best_score_global
             epoch += 1
             reset_condition += 1
 
-            if reset_condition == self.reset_condition_val:
-                print(
-                    f"No improvement. Best solution:\n{best_chrom_global} \nGenerating new population."
-                )
-                P_epoch = self.generate_population(is_candidate_mode)
-                P_epoch_scores = get_scores(P_epoch)
+            with observe(self.observer, "after_epoch"):
+                is_stopped = self.after_epoch(epoch, P_epoch, P_epoch_scores)
+            if is_stopped:
+                self.stop_reason = STOPPED
+            else:
+                self.stop_reason = stop_conditions.check(best_score_global)
+            is_converged = (
+                self.diversity_reset is not None
+                and self.diversity <= self.diversity_reset
+            )
+            if self.stop_reason is None and (
+                reset_condition == self.reset_condition_val or is_converged
+            ):
+                if is_converged:
+                    reporter.event(
+                        "Population converged, unique share: {diversity:.2f}. Generating new population.",
+                        diversity=self.diversity,
+                    )
+                else:
+                    reporter.event(
+                        "No improvement. Best solution:\n{solution} \nGenerating new population.",
+                        solution=best_chrom_global,
+                    )
+                with observe(self.observer, "reset"):
+                    P_epoch = self.generate_population(is_candidate_mode, out=P_epoch)
+                    P_epoch_scores = self.init_fitness(P_epoch)
                 reset_history.append((best_chrom_global, best_score_global))
+            if self.observer is not None:
+                self.observer.end_epoch(epoch)
+            if self.stop_reason is not None:
+                break
 
         if is_solved:
-            print(f"Problem solved. Solution:\n{best_chrom_global}\n")
+            self.stop_reason = SOLVED
+            if cache_key is not None:
+                self.cache.store(cache_key, best_chrom_global)
+            reporter.result(
+                "Problem solved. Solution:\n{solution}\n", solution=best_chrom_global
+            )
         else:
-            print(f"Unsolved. Best chromosome:\n{best_chrom_global}\n")
+            if self.stop_reason is None:
+                self.stop_reason = MAX_EPOCH
+            reporter.result(
+                "Unsolved. Best chromosome:\n{solution}\n", solution=best_chrom_global
+            )
 
         return (
             best_chrom_global,
             best_score_global,
-            np.array(best_score_per_epoch),
+            best_score_per_epoch[:epoch],
             reset_history,
         )
+
+    def solve_many(self, boards, is_candidate_mode=False, verbose=False):
+        """
+        Solves each of boards (see iter_sudokus) in turn, reusing buffers
+        and random state of the solver. Yields (board_id, solution, score,
+        epochs, elapsed) as soon as a board is finished, so boards can be
+        a generator of any length. verbose is used only if the solver
+        has no reporter
+        """
+        was_verbose = self.verbose
+        self.verbose = verbose
+        try:
+            for board_id, sudoku in iter_sudokus(boards):
+                start_time = perf_counter()
+                solution, score, score_per_epoch, _ = self.solve(
+                    sudoku, is_candidate_mode
+                )
+                elapsed = perf_counter() - start_time
+                yield board_id, solution, score, len(score_per_epoch), elapsed
+        finally:
+            self.verbose = was_verbose
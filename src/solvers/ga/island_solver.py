@@ -0,0 +1,253 @@
+import numpy as np
+import multiprocessing as mp
+import os
+import sys
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+
+sys.path.append("src/")
+from solvers.ga.ga_solver import GeneticAlgorithmSolver
+from solvers.stopping import SOLVED, TARGET_SCORE, CACHED, PRESOLVED
+from problem.sudoku_manager import Sudoku
+
+TOPOLOGIES = ("ring", "all")
+# Seconds an island waits for the others at migration before it stops
+MIGRATION_TIMEOUT = 60
+# Stop reasons of an island which stop all the others
+FOUND_REASONS = (SOLVED, TARGET_SCORE, CACHED, PRESOLVED)
+
+
+class MigrationBarrier:
+    """
+    Barrier of islands processes, which an island leaves when its solve
+    ends, so the remaining islands keep migrating without it.
+    Like multiprocessing.Barrier, wait raises BrokenBarrierError
+    once the barrier is aborted or a wait times out
+    """
+
+    def __init__(self, parties):
+        self.condition = mp.Condition()
+        # Islands still in the barrier, 1 for each of them
+        self.members = mp.RawArray("b", [1] * parties)
+        # parties, waiting, generation, is_broken
+        self.state = mp.RawArray("i", [parties, 0, 0, 0])
+
+    def release(self):
+        self.state[1] = 0
+        self.state[2] += 1
+        self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        with self.condition:
+            if self.state[3]:
+                raise BrokenBarrierError
+            generation = self.state[2]
+            self.state[1] += 1
+            if self.state[1] >= self.state[0]:
+                self.release()
+                return
+            is_released = self.condition.wait_for(
+                lambda: self.state[2] != generation or self.state[3], timeout
+            )
+            if self.state[2] != generation:
+                return
+            if not is_released:
+                self.state[3] = 1
+                self.condition.notify_all()
+            raise BrokenBarrierError
+
+    def leave(self, island_id):
+        with self.condition:
+            self.members[island_id] = 0
+            self.state[0] -= 1
+            if self.state[1] and self.state[1] >= self.state[0]:
+                self.release()
+
+    def abort(self):
+        with self.condition:
+            self.state[3] = 1
+            self.condition.notify_all()
+
+
+class IslandSolver(GeneticAlgorithmSolver):
+    """
+    GeneticAlgorithmSolver evolving one island of IslandModelSolver.
+    Every migration_interval epochs it puts copies of its best chromosomes
+    into its slot of the shared migrants array and replaces its worst
+    chromosomes with migrants from source islands still evolving
+    """
+
+    def __init__(
+        self,
+        island_id,
+        sources,
+        migrants,
+        barrier,
+        stop_event,
+        migration_interval,
+        migration_timeout=MIGRATION_TIMEOUT,
+        **ga_params,
+    ):
+        super().__init__(**ga_params)
+        self.island_id = island_id
+        self.sources = sources
+        self.migrants = migrants
+        self.barrier = barrier
+        self.stop_event = stop_event
+        self.migration_interval = migration_interval
+        self.migration_timeout = migration_timeout
+
+    def after_epoch(self, epoch, P, scores):
+        if self.stop_event.is_set():
+            return True
+        if epoch % self.migration_interval:
+            return False
+
+        migrants_count = self.migrants.shape[1]
+        best_ids = np.argsort(scores)[-migrants_count:]
+        self.migrants[self.island_id] = P[best_ids]
+        try:
+            # All islands write their migrants before anyone reads them,
+            # and read them before anyone writes the next ones
+            self.barrier.wait(self.migration_timeout)
+            sources = [i for i in self.sources if self.barrier.members[i]]
+            if sources:
+                incoming = self.migrants[sources].reshape(-1, P.shape[1])
+                worst_ids = np.argsort(scores)[: len(incoming)]
+                P[worst_ids] = incoming
+                self.refresh_fitness(P, worst_ids)
+            self.barrier.wait(self.migration_timeout)
+        except BrokenBarrierError:
+            return True
+        return False
+
+
+def run_island(island_id, sudoku, is_candidate_mode, shm_name, shape, kwargs, queue):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    migrants = np.ndarray(shape, dtype=np.int8, buffer=shm.buf)
+    is_stopping = True
+    try:
+        solver = IslandSolver(
+            island_id,
+            migrants=migrants,
+            **kwargs,
+        )
+        results = solver.solve(sudoku, is_candidate_mode)
+        is_stopping = solver.stop_reason in FOUND_REASONS
+        queue.put((island_id, results))
+    except Exception as error:
+        queue.put((island_id, error))
+        raise
+    finally:
+        # An island which found a solution or failed stops the other
+        # islands, also those waiting for migration. Otherwise it leaves
+        # the barrier and the other islands keep evolving
+        if is_stopping:
+            kwargs["stop_event"].set()
+            kwargs["barrier"].abort()
+        else:
+            kwargs["barrier"].leave(island_id)
+        del migrants
+        shm.close()
+
+
+class IslandModelSolver:
+    """
+    Runs islands_count populations of GeneticAlgorithmSolver in separate
+    processes. Every migration_interval epochs each island sends copies
+    of its migrants_count best chromosomes to the next island ("ring")
+    or to all other islands ("all"), through shared memory.
+    An island waits at most migration_timeout seconds for the others
+    at migration. All islands stop as soon as any of them solves
+    the sudoku (or reaches target_score) or fails. An island meeting
+    another stop condition (such as stagnation_window) ends alone
+    and the others keep migrating without it
+    """
+
+    def __init__(
+        self,
+        pop_size,
+        islands_count=None,
+        migration_interval=25,
+        migrants_count=5,
+        topology="ring",
+        migration_timeout=MIGRATION_TIMEOUT,
+        seed=None,
+        **ga_params,
+    ):
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology: {topology}")
+        self.pop_size = pop_size
+        self.islands_count = islands_count or os.cpu_count()
+        self.migration_interval = migration_interval
+        self.migrants_count = migrants_count
+        self.topology = topology
+        self.migration_timeout = migration_timeout
+        self.seed = seed
+        self.ga_params = ga_params
+
+    def get_sources(self, island_id):
+        """
+        Returns ids of islands sending migrants to given island
+        """
+        if self.topology == "ring":
+            return [(island_id - 1) % self.islands_count]
+        return [i for i in range(self.islands_count) if i != island_id]
+
+    def solve(self, sudoku: Sudoku, is_candidate_mode=False):
+        """
+        Returns results of the island with the best score, in the shape
+        of GeneticAlgorithmSolver.solve, and results of all islands
+        """
+        # Each island gets its own substream of the seed
+        seeds = np.random.SeedSequence(self.seed).spawn(self.islands_count)
+        shape = (self.islands_count, self.migrants_count, sudoku.geometry.cells)
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        barrier = MigrationBarrier(self.islands_count)
+        stop_event = mp.Event()
+        queue = mp.Queue()
+        try:
+            islands = []
+            for island_id in range(self.islands_count):
+                kwargs = dict(
+                    self.ga_params,
+                    pop_size=self.pop_size,
+                    seed=seeds[island_id],
+                    sources=self.get_sources(island_id),
+                    barrier=barrier,
+                    stop_event=stop_event,
+                    migration_interval=self.migration_interval,
+                    migration_timeout=self.migration_timeout,
+                )
+                island = mp.Process(
+                    target=run_island,
+                    args=(
+                        island_id,
+                        sudoku,
+                        is_candidate_mode,
+                        shm.name,
+                        shape,
+                        kwargs,
+                        queue,
+                    ),
+                )
+                island.start()
+                islands.append(island)
+
+            islands_results = [None] * self.islands_count
+            for _ in range(self.islands_count):
+                island_id, results = queue.get()
+                islands_results[island_id] = results
+            for island in islands:
+                island.join()
+            for island_id, results in enumerate(islands_results):
+                if isinstance(results, Exception):
+                    raise RuntimeError(f"Island {island_id} failed") from results
+        finally:
+            shm.close()
+            shm.unlink()
+
+        best_island = max(
+            range(self.islands_count), key=lambda i: islands_results[i][1]
+        )
+        return islands_results[best_island], islands_results
@@ -0,0 +1,70 @@
+import numpy as np
+from functools import partial
+
+
+def alias_table(weights):
+    """
+    Builds alias table of given weights: probability of keeping each id
+    and its alias, so an id is drawn with probability proportional
+    to its weight in O(1). All ids are equally likely if all weights are 0.
+    Built by sweeping (Vose's pairing in a fixed order) with prefix sums:
+    each light id (weight below mean) is filled by the first heavy id
+    that has excess left, heavy ids are filled by the next heavy one
+    """
+    count = len(weights)
+    total = float(np.sum(weights))
+    if total <= 0:
+        return np.ones(count), np.arange(count)
+    scaled = np.asarray(weights, dtype=float) * (count / total)
+    lights = np.flatnonzero(scaled < 1)
+    heavies = np.flatnonzero(scaled >= 1)
+    keep = np.ones(count)
+    alias = np.arange(count)
+
+    deficit = np.concatenate(([0.0], np.cumsum(1 - scaled[lights])))
+    excess = np.cumsum(scaled[heavies] - 1)
+    donors = np.searchsorted(excess, deficit[:-1], side="right")
+    # Lights left without a donor (none is heavy, or the last donor's excess
+    # ran out) are short of 1 only by float rounding, so they keep themselves
+    is_left = donors >= len(heavies)
+    keep[lights] = np.where(is_left, 1, scaled[lights])
+    alias[lights[~is_left]] = heavies[donors[~is_left]]
+    # Count of lights filled (at least in part) by each heavy and heavies before
+    filled = np.searchsorted(deficit[:-1], excess[:-1], side="left")
+    keep[heavies[:-1]] = np.clip(1 + excess[:-1] - deficit[filled], 0, 1)
+    alias[heavies[:-1]] = heavies[1:]
+    return keep, alias
+
+
+def roulette(scores, count, rand_object):
+    """
+    Fitness proportional selection of count ids, on scores shifted
+    so the worst one has no chance (unless all are equal),
+    drawn from alias table
+    """
+    keep, alias = alias_table(scores - np.amin(scores))
+    ids = rand_object.integers(0, len(scores), count)
+    is_kept = rand_object.uniform(0, 1, count) < keep[ids]
+    return np.where(is_kept, ids, alias[ids])
+
+
+def tournament(scores, count, rand_object, tournament_size=3):
+    """
+    Selection of count ids, each the best of tournament_size ids
+    drawn at random (the first of them if scores are equal)
+    """
+    entrants = rand_object.integers(0, len(scores), (count, tournament_size))
+    winners = np.argmax(scores[entrants], axis=1)
+    return entrants[np.arange(count), winners]
+
+
+def get_selection_operator(name, tournament_size=3):
+    """
+    Returns selection operator of given name: function of scores, count
+    of ids to select and random source, returning array of selected ids
+    """
+    if name == "roulette":
+        return roulette
+    if name == "tournament":
+        return partial(tournament, tournament_size=tournament_size)
+    raise ValueError(f"Unknown selection operator: {name}")
@@ -0,0 +1,113 @@
+import contextlib
+import tracemalloc
+from time import perf_counter
+
+# Returned for every phase when solver has no observer, so phases
+# cost one function call and an empty with block
+NO_PHASE = contextlib.nullcontext()
+
+
+def observe(observer, name):
+    """
+    Returns context of phase name of an epoch, reported to observer
+    """
+    if observer is None:
+        return NO_PHASE
+    return Phase(observer, name)
+
+
+class Phase:
+    def __init__(self, observer, name):
+        self.observer = observer
+        self.name = name
+
+    def __enter__(self):
+        self.observer.start_phase(self.name)
+
+    def __exit__(self, *exc_info):
+        self.observer.end_phase(self.name)
+
+
+class SolverObserver:
+    """
+    Observer of phases of solver epochs, passed to solver as observer.
+    Every method does nothing, subclasses override the ones they need
+    """
+
+    def start_phase(self, name):
+        pass
+
+    def end_phase(self, name):
+        pass
+
+    def end_epoch(self, epoch):
+        pass
+
+
+class PhaseProfiler(SolverObserver):
+    """
+    Records time and calls count of each phase, in total and in each epoch.
+    With track_allocations it also records the peak of memory allocated
+    during each phase, traced with tracemalloc (which slows everything
+    down, so it is off by default)
+    """
+
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # name -> [time, calls count, peak of allocated bytes]
+        self.totals = {}
+        # name -> [time, calls count, peak of allocated bytes] of the phase,
+        # for each finished epoch
+        self.epochs = []
+        self.current_epoch = {}
+        self.started = {}
+
+    def start_phase(self, name):
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            self.started[name] = (perf_counter(), tracemalloc.get_traced_memory()[0])
+        else:
+            self.started[name] = (perf_counter(), 0)
+
+    def end_phase(self, name):
+        start_time, start_memory = self.started.pop(name)
+        elapsed = perf_counter() - start_time
+        allocated = 0
+        if self.track_allocations:
+            allocated = tracemalloc.get_traced_memory()[1] - start_memory
+
+        for records in (self.totals, self.current_epoch):
+            record = records.setdefault(name, [0.0, 0, 0])
+            record[0] += elapsed
+            record[1] += 1
+            record[2] = max(record[2], allocated)
+
+    def end_epoch(self, epoch):
+        self.epochs.append(self.current_epoch)
+        self.current_epoch = {}
+
+    def summary(self):
+        """
+        Returns table with total time, calls count, mean time
+        and share of time of each phase
+        """
+        total_time = sum(total[0] for total in self.totals.values()) or 1.0
+        header = (
+            f"{'phase':<20}{'calls':>8}{'total [s]':>12}{'mean [ms]':>12}{'share':>8}"
+        )
+        if self.track_allocations:
+            header += f"{'peak [KiB]':>12}"
+        lines = [header]
+        for name, (elapsed, calls, allocated) in sorted(
+            self.totals.items(), key=lambda item: -item[1][0]
+        ):
+            line = (
+                f"{name:<20}{calls:>8}{elapsed:>12.4f}"
+                f"{1000 * elapsed / calls:>12.4f}{elapsed / total_time:>8.1%}"
+            )
+            if self.track_allocations:
+                line += f"{allocated / 1024:>12.1f}"
+            lines.append(line)
+        return "\n".join(lines)
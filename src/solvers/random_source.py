@@ -0,0 +1,119 @@
+import numpy as np
+
+# Count of uniforms drawn from the generator at once
+DRAWS_BLOCK = 4096
+
+
+class RandomSource:
+    """
+    Random numbers of a solver, drawn with numpy.random.Generator.
+    Uniforms are drawn in blocks of block_size numbers and handed out
+    from the current block (moving its cursor), one at a time or
+    as arrays, so most draws make no call to the generator at all.
+    The same seed (int or SeedSequence) gives the same numbers, spawn
+    gives independent substreams (e.g. one per ant, island or run)
+    """
+
+    def __init__(self, seed=None, block_size=DRAWS_BLOCK):
+        if isinstance(seed, np.random.SeedSequence):
+            self.seed_sequence = seed
+        else:
+            self.seed_sequence = np.random.SeedSequence(seed)
+        self.generator = np.random.Generator(np.random.PCG64(self.seed_sequence))
+        self.block_size = block_size
+        self.refill()
+
+    def refill(self):
+        self.block = self.generator.random(self.block_size)
+        # Python floats of the block, made only if single numbers are drawn
+        self.block_list = None
+        self.cursor = 0
+
+    def spawn(self, count):
+        """
+        Returns count independent substreams of this source
+        """
+        return [
+            RandomSource(seed_sequence, self.block_size)
+            for seed_sequence in self.seed_sequence.spawn(count)
+        ]
+
+    def take(self, count):
+        """
+        Returns array of the next count uniforms from [0, 1)
+        """
+        left = len(self.block) - self.cursor
+        if count > left:
+            values = np.concatenate(
+                (self.block[self.cursor :], self.generator.random(count - left))
+            )
+            self.refill()
+            return values
+        values = self.block[self.cursor : self.cursor + count]
+        self.cursor += count
+        return values
+
+    def random(self):
+        """
+        Returns the next uniform from [0, 1), as Python float
+        """
+        if self.cursor == len(self.block):
+            self.refill()
+        if self.block_list is None:
+            self.block_list = self.block.tolist()
+        value = self.block_list[self.cursor]
+        self.cursor += 1
+        return value
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        if size is None:
+            return low + (high - low) * self.random()
+        values = self.take(int(np.prod(size))).reshape(size)
+        if low == 0.0 and high == 1.0:
+            return values
+        return low + (high - low) * values
+
+    def integers(self, low, high, size=None):
+        """
+        Returns integers from [low, high), high can be an array
+        of the given size
+        """
+        if size is None and np.ndim(high) == 0:
+            return low + int(self.random() * (high - low))
+        if size is None:
+            size = np.shape(high)
+        values = self.take(int(np.prod(size))).reshape(size) * (np.asarray(high) - low)
+        return low + values.astype(np.intp)
+
+    def choice(self, options, size=None, p=None):
+        """
+        Returns element (or array of size elements) of options,
+        which can be a sequence or a number of options (as in numpy),
+        drawn with probabilities p (equal if None)
+        """
+        count = options if np.ndim(options) == 0 else len(options)
+        if p is None:
+            ids = self.integers(0, count, size)
+        else:
+            ids = self.weighted_ids(p, size)
+        if np.ndim(options) == 0:
+            return ids
+        if size is None:
+            return options[ids]
+        return np.asarray(options)[ids]
+
+    def weighted_ids(self, weights, size=None):
+        """
+        Returns id (or array of size ids) of weights, drawn with
+        probabilities proportional to weights
+        """
+        cumulative = np.cumsum(weights)
+        draws = self.uniform(size=size) * cumulative[-1]
+        ids = np.searchsorted(cumulative, draws, side="right")
+        return np.minimum(ids, len(cumulative) - 1)
+
+    def permutation(self, count):
+        return self.generator.permutation(count)
+
+    def shuffle(self, values):
+        self.generator.shuffle(values)
@@ -0,0 +1,127 @@
+import numpy as np
+import sys
+
+# Verbosity levels, each one reports also everything of the levels below
+QUIET = 0
+RESULT = 1  # solution found at the end of a solve
+EVENTS = 2  # improvements, resets
+EPOCHS = 3  # progress of each epoch
+TRACE_FORMATS = ("jsonl", "binary")
+# Record of trace of best score of an epoch, board_id is -1 if unknown
+TRACE_DTYPE = np.dtype(
+    [("solve", "<i4"), ("board_id", "<i4"), ("epoch", "<i4"), ("score", "<i4")]
+)
+
+
+class ProgressReporter:
+    """
+    Reports progress of solves: messages up to given verbosity, messages
+    of epochs only every `every` epochs. Messages are formatted only
+    if they are written.
+    Optionally writes trace of best score of each epoch to trace_path,
+    as JSON lines or as binary records of TRACE_DTYPE (trace_format),
+    buffered in memory buffer_size epochs at a time
+    """
+
+    def __init__(
+        self,
+        verbosity=EPOCHS,
+        every=1,
+        stream=None,
+        trace_path=None,
+        trace_format="jsonl",
+        buffer_size=4096,
+    ):
+        """
+        stream: file to write messages to, sys.stdout by default
+        """
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format: {trace_format}")
+        self.verbosity = verbosity
+        self.every = every
+        self.stream = stream
+        self.trace_format = trace_format
+        self.trace_file = None
+        if trace_path is not None:
+            mode = "ab" if trace_format == "binary" else "a"
+            self.trace_file = open(trace_path, mode)
+        self.trace = np.empty(buffer_size, dtype=TRACE_DTYPE)
+        self.trace_count = 0
+        self.solve_id = -1
+        self.board_id = -1
+
+    def start_solve(self, board_id=None):
+        self.solve_id += 1
+        self.board_id = -1 if board_id is None else board_id
+
+    def epoch(self, epoch, score, template, **values):
+        """
+        Traces best score of the epoch and writes template formatted
+        with epoch and values
+        """
+        if self.trace_file is not None:
+            if self.trace_count == len(self.trace):
+                self.flush()
+            self.trace[self.trace_count] = (self.solve_id, self.board_id, epoch, score)
+            self.trace_count += 1
+        if self.verbosity >= EPOCHS and epoch % self.every == 0:
+            self.write(template, epoch=epoch, **values)
+
+    def event(self, template, **values):
+        if self.verbosity >= EVENTS:
+            self.write(template, **values)
+
+    def result(self, template, **values):
+        if self.verbosity >= RESULT:
+            self.write(template, **values)
+
+    def write(self, template, **values):
+        print(template.format(**values), file=self.stream or sys.stdout)
+
+    def flush(self):
+        """
+        Writes buffered trace to the trace file
+        """
+        if self.trace_file is None:
+            return
+        records = self.trace[: self.trace_count]
+        if self.trace_format == "binary":
+            records.tofile(self.trace_file)
+        else:
+            self.trace_file.write(
+                "".join(
+                    f'{{"solve": {solve}, "board_id": {board_id}, "epoch": {epoch}, "score": {score}}}\n'
+                    for solve, board_id, epoch, score in records.tolist()
+                )
+            )
+        self.trace_file.flush()
+        self.trace_count = 0
+
+    def close(self):
+        if self.trace_file is not None:
+            self.flush()
+            self.trace_file.close()
+            self.trace_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_trace(trace_path):
+    """
+    Reads binary trace written by ProgressReporter, as array of TRACE_DTYPE
+    """
+    return np.fromfile(trace_path, dtype=TRACE_DTYPE)
+
+
+def get_reporter(reporter, verbose):
+    """
+    Returns reporter of a solver, or, if it has none, reporter
+    printing every epoch if verbose and nothing otherwise
+    """
+    if reporter is not None:
+        return reporter
+    return ProgressReporter(EPOCHS if verbose else QUIET)
@@ -0,0 +1,95 @@
+import numpy as np
+import os
+import sys
+from collections import OrderedDict
+
+sys.path.append("src/")
+from constants import SIZE
+from problem.canonical import canonical_form, apply_transform, invert_transform
+
+
+class SolutionCache:
+    """
+    LRU cache of solutions of boards, shared by solvers passed it as cache.
+    Solutions are kept in canonical form of their boards, so a board
+    equivalent to a solved one (transposed, with rows or columns permuted
+    within bands, numbers relabeled) is a hit as well.
+    Keeps at most max_entries solutions and max_bytes bytes of boards
+    and solutions (None for no limit), dropping the least recently used.
+    With path, it is loaded from it (if it exists) and saved to it by save
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        # canonical board bytes -> canonical solution bytes
+        self.entries = OrderedDict()
+        self.bytes_count = 0
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def lookup(self, board):
+        """
+        Returns solution of board (array of shape (SIZE, SIZE)) or None
+        if it is not cached, and the key to store its solution with.
+        Boards of other sizes are never cached, their key is None
+        """
+        if board.size != SIZE**2:
+            return None, None
+        canonical_board, transform = canonical_form(board)
+        key = (canonical_board.tobytes(), transform)
+        solution = self.entries.get(key[0])
+        if solution is None:
+            self.misses += 1
+            return None, key
+        self.hits += 1
+        self.entries.move_to_end(key[0])
+        solution = np.frombuffer(solution, dtype=np.uint8).reshape(SIZE, SIZE)
+        return invert_transform(solution, transform).astype(board.dtype), key
+
+    def store(self, key, solution):
+        """
+        Stores solution of board with key returned by lookup
+        """
+        board_bytes, transform = key
+        solution = apply_transform(solution, transform).astype(np.uint8)
+        self.add(board_bytes, solution.tobytes())
+
+    def add(self, board_bytes, solution_bytes):
+        if board_bytes in self.entries:
+            self.entries.move_to_end(board_bytes)
+            return
+        self.entries[board_bytes] = solution_bytes
+        self.bytes_count += len(board_bytes) + len(solution_bytes)
+        while self.entries and (
+            (self.max_entries is not None and len(self.entries) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes_count > self.max_bytes)
+        ):
+            dropped_board, dropped_solution = self.entries.popitem(last=False)
+            self.bytes_count -= len(dropped_board) + len(dropped_solution)
+
+    def save(self, path=None):
+        """
+        Saves entries, from the least recently used, to path
+        (or path of the cache)
+        """
+        path = path or self.path
+        boards = np.frombuffer(b"".join(self.entries.keys()), dtype=np.uint8)
+        solutions = np.frombuffer(b"".join(self.entries.values()), dtype=np.uint8)
+        with open(path, "wb") as cache_file:
+            np.savez(
+                cache_file,
+                boards=boards.reshape(-1, SIZE**2),
+                solutions=solutions.reshape(-1, SIZE**2),
+            )
+
+    def load(self, path):
+        with np.load(path) as saved:
+            for board, solution in zip(saved["boards"], saved["solutions"]):
+                self.add(board.tobytes(), solution.tobytes())
+
+    def __len__(self):
+        return len(self.entries)
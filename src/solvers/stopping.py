@@ -0,0 +1,46 @@
+from time import perf_counter
+
+# Reasons of the end of a solve, kept in stop_reason of the solver
+SOLVED = "solved"
+MAX_EPOCH = "max_epoch"
+DEADLINE = "deadline"
+TARGET_SCORE = "target_score"
+STAGNATION = "stagnation"
+STOPPED = "stopped"  # after_epoch returned True
+CACHED = "cached"  # solution found in cache of the solver
+PRESOLVED = "presolved"  # all tiles set by presolve, before the search
+
+
+class StopConditions:
+    """
+    Early stopping of a single solve: after time_limit seconds from its
+    creation, once the best score reaches target_score, or after
+    stagnation_window epochs without improvement of the best score.
+    Conditions left None are never met
+    """
+
+    def __init__(self, time_limit=None, target_score=None, stagnation_window=None):
+        self.deadline = None if time_limit is None else perf_counter() + time_limit
+        self.target_score = target_score
+        self.stagnation_window = stagnation_window
+        self.best_score = None
+        self.stagnation = 0
+
+    def check(self, best_score):
+        """
+        Called after each epoch with the best score of the epoch
+        (or so far), returns reason of stopping or None
+        """
+        if self.target_score is not None and best_score >= self.target_score:
+            return TARGET_SCORE
+        if self.stagnation_window is not None:
+            if self.best_score is None or best_score > self.best_score:
+                self.best_score = best_score
+                self.stagnation = 0
+            else:
+                self.stagnation += 1
+                if self.stagnation >= self.stagnation_window:
+                    return STAGNATION
+        if self.deadline is not None and perf_counter() >= self.deadline:
+            return DEADLINE
+        return None
@@ -0,0 +1,19 @@
+import numpy as np
+import sys
+
+sys.path.append("src/")
+from solvers.ga.selection import alias_table, roulette
+from solvers.random_source import RandomSource
+
+
+def test_alias_table_single_nonzero_weight():
+    keep, alias = alias_table(np.array([0.0, 0.0, 49.0, 0.0]))
+    assert np.all(np.where(keep < 1, alias, np.arange(4)) == 2)
+    keep, alias = alias_table(np.array([49.0]))
+    assert keep[0] == 1 and alias[0] == 0
+
+
+def test_roulette_single_nonzero_score():
+    scores = np.array([3, 3, 5, 3])
+    ids = roulette(scores, 100, RandomSource(1))
+    assert np.all(ids == 2)